@@ -2,7 +2,7 @@ from flask import Blueprint, request, jsonify
 from models.mongo_models import users
 from jose import jwt
 from config import Config
-from werkzeug.security import generate_password_hash, check_password_hash
+from core.auth import hash_password, check_password, PasswordHashBusy
 from datetime import datetime, timedelta
 from bson import ObjectId
 
@@ -16,6 +16,14 @@ def create_token(user_id):
     }
     return jwt.encode(payload, Config.JWT_SECRET, algorithm="HS256")
 
+
+@bp.errorhandler(PasswordHashBusy)
+def hash_busy(e):
+    resp = jsonify({"error": str(e)})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "2"
+    return resp
+
 # --- Register ---
 @bp.route('/register', methods=['POST'])
 def register():
@@ -32,7 +40,7 @@ def register():
         "name": data["name"],
         "email": data["email"].lower().strip(),
         "phone": data["phone"],
-        "password": generate_password_hash(data["password"]),
+        "password": hash_password(data["password"]),
         "created_at": datetime.utcnow()
     }
 
@@ -59,7 +67,7 @@ def login():
         return jsonify({"error": "Email and password required"}), 400
 
     user = users.find_one({"email": data["email"].lower().strip()})
-    if not user or not check_password_hash(user["password"], data["password"]):
+    if not user or not check_password(user["password"], data["password"]):
         return jsonify({"error": "Invalid email or password"}), 401
 
     token = create_token(user["_id"])
@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, Response
+from core import metrics
 
 bp = Blueprint('health', __name__, url_prefix='/api')
 
 @bp.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,51 +1,34 @@
-from flask import Blueprint, jsonify, send_file, request
+from flask import Blueprint, jsonify, send_file, request, make_response, Response
 from models.mongo_models import notes
-from core.utils import export_to_pdf, export_to_docx
+from core.exports import FORMATS, get_export, export_etag, stream_zip
+from core.notes_parser import summary_preview
+from core import transcript_store, search
+from core.auth import get_user_from_auth
 from bson import ObjectId
-from jose import jwt, JWTError
 from config import Config
-import os
-import traceback
+import io
+from datetime import datetime
 
 bp = Blueprint('notes', __name__, url_prefix='/api')
 
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 100
 
-# ------------------ AUTH HELPER ------------------
-def get_user_from_auth():
-    """
-    Extract user_id from JWT.
-    Falls back to 'demo_user' if token is invalid or missing.
-    """
-    auth = request.headers.get("Authorization", "")
-    if not auth:
-        return "demo_user"
-
-    try:
-        parts = auth.split()
-        if len(parts) != 2 or parts[0].lower() != "bearer":
-            return "demo_user"
-
-        token = parts[1]
-        payload = jwt.decode(token, Config.JWT_SECRET, algorithms=["HS256"])
-        user_id = str(payload.get("sub"))  # sub → user_id stored in JWT
-        print(user_id)
-        return user_id if user_id else "demo_user"
-    except JWTError:
-        # Invalid / expired token
-        return "demo_user"
-    except Exception as e:
-        print("⚠️ [get_user_from_auth] Error decoding token:", e)
-        traceback.print_exc()
-        return "demo_user"
+# /api/notes/<id>?fields= — what can be asked for, and what comes back without it
+NOTE_FIELDS = (
+    "note_id", "final_notes", "notes_tree", "summary_preview", "detected_language", "created_at",
+    "upload_id", *transcript_store.FIELDS,
+)
+DEFAULT_NOTE_FIELDS = ["note_id", "final_notes", "raw_transcript", "cleaned_transcript", "created_at"]
 
 
 # ------------------ DB HELPERS ------------------
-def get_note_by_id(note_id: str):
+def get_note_by_id(note_id: str, projection=None):
     """Fetch note by either string _id or ObjectId."""
     try:
-        n = notes.find_one({"_id": ObjectId(note_id)})
+        n = notes.find_one({"_id": ObjectId(note_id)}, projection)
         if not n:
-            n = notes.find_one({"_id": note_id})
+            n = notes.find_one({"_id": note_id}, projection)
         return n
     except Exception:
         return None
@@ -54,35 +37,102 @@ def get_note_by_id(note_id: str):
 # ------------------ ROUTES ------------------
 @bp.route('/notes/<note_id>', methods=['GET'])
 def get_note(note_id):
-    """Return single note details by ID"""
-    n = get_note_by_id(note_id)
+    """
+    Return single note details by ID.
+    ?fields=final_notes,created_at,... picks fields (see NOTE_FIELDS);
+    transcripts are only loaded when asked for. Default = the original response.
+    """
+    fields = [f for f in request.args.get("fields", "").split(",") if f] or DEFAULT_NOTE_FIELDS
+    unknown = [f for f in fields if f not in NOTE_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    wanted = [f for f in fields if f in transcript_store.FIELDS]
+    projection = {f: 1 for f in fields if f not in transcript_store.FIELDS and f != "note_id"}
+    if wanted:
+        # notes saved before the transcript store still carry them inline
+        projection.update({f: 1 for f in transcript_store.FIELDS})
+    n = get_note_by_id(note_id, projection or {"_id": 1})
     if not n:
         return jsonify({"error": "Note not found"}), 404
 
-    return jsonify({
-        "note_id": str(n["_id"]),
-        "final_notes": n.get("final_notes", ""),
-        "raw_transcript": n.get("raw_transcript", ""),
-        "cleaned_transcript": n.get("cleaned_transcript", ""),
-        "created_at": n["created_at"].isoformat() if n.get("created_at") else None
-    })
+    body = {"note_id": str(n["_id"])}
+    if wanted:
+        body.update(transcript_store.load_transcripts(n, wanted))
+    for f in fields:
+        if f == "created_at":
+            body[f] = n["created_at"].isoformat() if n.get("created_at") else None
+        elif f not in body:
+            body[f] = n.get(f, "")
+    return jsonify(body)
+
+
+def user_id_filter(user_id):
+    """user_id as stored: a string, or an ObjectId on some older notes."""
+    ids = [user_id]
+    if ObjectId.is_valid(user_id):
+        ids.append(ObjectId(user_id))
+    return {"$in": ids}
+
+
+def parse_cursor(cursor):
+    """`<created_at ISO>,<note id>` → (datetime, _id); raises ValueError."""
+    stamp, _, note_id = cursor.rpartition(",")
+    created_at = datetime.fromisoformat(stamp)
+    return created_at, ObjectId(note_id) if ObjectId.is_valid(note_id) else note_id
+
+
+def backfill_previews(docs):
+    """Older notes have no stored summary_preview: compute it once and save it."""
+    missing = [d["_id"] for d in docs if "summary_preview" not in d]
+    if not missing:
+        return
+    previews = {}
+    for d in notes.find({"_id": {"$in": missing}}, {"final_notes": 1}):
+        previews[d["_id"]] = summary_preview(d.get("final_notes", ""))
+        notes.update_one({"_id": d["_id"]}, {"$set": {"summary_preview": previews[d["_id"]]}})
+    for d in docs:
+        if "summary_preview" not in d:
+            d["summary_preview"] = previews.get(d["_id"], "")
 
 
 @bp.route('/history', methods=['GET'])
 def history():
-    """Return logged-in user's history of processed notes"""
+    """
+    Return logged-in user's history of processed notes, newest first.
+    Paginated by keyset: pass the X-Next-Cursor response header back as
+    ?before=<created_at,id> (with optional &limit=, max HISTORY_MAX_LIMIT).
+    """
     user_id = get_user_from_auth()
     print("🧠 HISTORY DEBUG — user_id from JWT:", user_id)
     # 🔒 Block guests
     if user_id == "demo_user":
         return jsonify({"error": "Login required to view history"}), 401
 
-    # 🔍 Fetch user-specific notes
     try:
-        docs = list(notes.find({"user_id": user_id}).sort("created_at", -1).limit(50))
-        if not docs:
-            # In case some old notes stored user_id as ObjectId
-            docs = list(notes.find({"user_id": ObjectId(user_id)}).sort("created_at", -1).limit(50))
+        limit = min(max(1, int(request.args.get("limit", HISTORY_DEFAULT_LIMIT))), HISTORY_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    query = {"user_id": user_id_filter(user_id)}
+    if request.args.get("before"):
+        try:
+            created_at, note_id = parse_cursor(request.args["before"])
+        except ValueError:
+            return jsonify({"error": "before must be <created_at>,<note_id>"}), 400
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": note_id}},
+        ]
+
+    # 🔍 Only the fields the list shows (never the transcripts)
+    try:
+        docs = list(
+            notes.find(query, {"created_at": 1, "summary_preview": 1})
+            .sort([("created_at", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        backfill_previews(docs)
     except Exception as e:
         print("⚠️ [history] DB fetch error:", e)
         docs = []
@@ -91,35 +141,148 @@ def history():
         {
             "note_id": str(d["_id"]),
             "created_at": d["created_at"].isoformat() if d.get("created_at") else None,
-            "summary_preview": (d.get("final_notes", "")[:120] + "...") if d.get("final_notes") else ""
+            "summary_preview": d.get("summary_preview", "")
         }
         for d in docs
     ]
 
-    return jsonify(history_data)
+    resp = jsonify(history_data)
+    if len(docs) == limit and docs[-1].get("created_at"):
+        resp.headers["X-Next-Cursor"] = f"{docs[-1]['created_at'].isoformat()},{docs[-1]['_id']}"
+    return resp
 
 
-@bp.route('/download/pdf/<note_id>', methods=['GET'])
-def download_pdf(note_id):
-    """Download note as PDF"""
-    n = get_note_by_id(note_id)
+@bp.route('/search', methods=['GET'])
+def search_notes():
+    """
+    Ranked full-text search over the user's notes and transcripts.
+    ?q=<words>&limit=&offset= → {"query", "total", "results": [{note_id, score,
+    created_at, snippet}], "next_offset"}; snippets mark hits with <mark>.
+    """
+    user_id = get_user_from_auth()
+    if user_id == "demo_user":
+        return jsonify({"error": "Login required to search notes"}), 401
+
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = min(max(1, int(request.args.get("limit", 20))), search.MAX_LIMIT)
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    try:
+        found = search.search(user_id, query, limit=limit, offset=offset)
+    except Exception as e:
+        print("⚠️ [search] Query failed:", e)
+        return jsonify({"error": "Search failed"}), 500
+
+    next_offset = offset + limit if offset + limit < found["total"] else None
+    return jsonify({"query": query, **found, "next_offset": next_offset})
+
+
+def send_export(note_id, fmt):
+    """Serve a cached export with ETag / Last-Modified; 304 when the client copy is current."""
+    n = get_note_by_id(note_id, {"final_notes": 1, "notes_tree": 1, "created_at": 1})
     if not n:
         return jsonify({"error": "Note not found in DB"}), 404
 
-    os.makedirs("storage/exports", exist_ok=True)
-    path = f"storage/exports/{note_id}.pdf"
-    export_to_pdf(n.get("final_notes", ""), path)
-    return send_file(path, as_attachment=True, mimetype="application/pdf")
+    notes_text = n.get("final_notes", "")
+    etag = export_etag(notes_text, fmt)
+    last_modified = n.get("created_at")
+
+    # answer revalidation before touching the renderer or the disk
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+        resp.set_etag(etag)
+        if last_modified:
+            resp.last_modified = last_modified
+        return resp
+
+    data = get_export(str(n["_id"]), notes_text, fmt, n.get("notes_tree"))
+    resp = send_file(
+        io.BytesIO(data),
+        as_attachment=True,
+        mimetype=FORMATS[fmt]["mimetype"],
+        download_name=f"{note_id}.{fmt}",
+        etag=etag,
+        last_modified=last_modified,
+        conditional=True,
+    )
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+@bp.route('/download/pdf/<note_id>', methods=['GET'])
+def download_pdf(note_id):
+    """Download note as PDF"""
+    return send_export(note_id, "pdf")
 
 
 @bp.route('/download/docx/<note_id>', methods=['GET'])
 def download_docx(note_id):
     """Download note as DOCX"""
-    n = get_note_by_id(note_id)
-    if not n:
-        return jsonify({"error": "Note not found in DB"}), 404
+    return send_export(note_id, "docx")
+
+
+@bp.route('/export/bulk', methods=['POST'])
+def bulk_export():
+    """
+    Stream a ZIP of many notes: {"note_ids": [...]} or {"from": ISO, "to": ISO},
+    plus "format": "pdf" | "docx". Documents render in parallel and each ZIP
+    entry is sent as soon as it's ready.
+    """
+    user_id = get_user_from_auth()
+    if user_id == "demo_user":
+        return jsonify({"error": "Login required to export notes"}), 401
+
+    data = request.get_json(silent=True) or {}
+    fmt = (data.get("format") or "pdf").lower()
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be pdf or docx"}), 400
+
+    query = {"user_id": user_id_filter(user_id)}
+    if data.get("note_ids"):
+        if not isinstance(data["note_ids"], list):
+            return jsonify({"error": "note_ids must be a list"}), 400
+        # like get_note_by_id: an ObjectId _id, or a plain string one
+        ids = []
+        for note_id in map(str, data["note_ids"]):
+            ids.append(note_id)
+            if ObjectId.is_valid(note_id):
+                ids.append(ObjectId(note_id))
+        query["_id"] = {"$in": ids}
+    elif data.get("from") or data.get("to"):
+        try:
+            created = {}
+            if data.get("from"):
+                created["$gte"] = datetime.fromisoformat(data["from"])
+            if data.get("to"):
+                created["$lte"] = datetime.fromisoformat(data["to"])
+        except ValueError:
+            return jsonify({"error": "from/to must be ISO dates"}), 400
+        query["created_at"] = created
+    else:
+        return jsonify({"error": "note_ids or from/to required"}), 400
+
+    docs = list(
+        notes.find(query, {"final_notes": 1, "notes_tree": 1, "created_at": 1})
+        .sort("created_at", -1)
+        .limit(Config.BULK_EXPORT_MAX_NOTES)
+    )
+    if not docs:
+        return jsonify({"error": "No notes found"}), 404
+
+    items = []
+    for d in docs:
+        stamp = d["created_at"].strftime("%Y-%m-%d_%H%M") if d.get("created_at") else "note"
+        items.append((
+            f"{stamp}_{d['_id']}.{fmt}", str(d["_id"]), d.get("final_notes", ""), d.get("notes_tree")
+        ))
 
-    os.makedirs("storage/exports", exist_ok=True)
-    path = f"storage/exports/{note_id}.docx"
-    export_to_docx(n.get("final_notes", ""), path)
-    return send_file(path, as_attachment=True, mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    return Response(
+        stream_zip(items, fmt),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="notes-{fmt}.zip"'},
+    )
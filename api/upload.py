@@ -1,18 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
-import os, uuid, requests, subprocess, re
+import os, uuid, hashlib, json, time
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: chunks aren't locked
+    fcntl = None
 from datetime import datetime
 from models.mongo_models import uploads
 from core.ai_pipeline import process_upload
 from core.tasks import process_upload_task
-from jose import jwt
+from core.meeting_url_handler import is_supported_url
+from core import progress
+from core.auth import get_user_from_auth
 from config import Config
 
 bp = Blueprint("upload", __name__, url_prefix="/api")
 
 ALLOWED = {"wav", "mp3", "mp4", "m4a", "webm"}
-TEMP_DIR = "tmp_downloads"
-os.makedirs(TEMP_DIR, exist_ok=True)
+SPOOL_DIR = os.path.join(Config.UPLOAD_FOLDER, "spool")
+SPOOL_BLOCK_SIZE = 64 * 1024
+# how often (per process) /upload/init looks for abandoned spool files
+SPOOL_SWEEP_INTERVAL = 600
+_last_sweep = 0.0
+os.makedirs(SPOOL_DIR, exist_ok=True)
 
 
 # ------------------------------- helpers -------------------------------
@@ -21,77 +31,97 @@ def allowed(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED
 
 
-def get_user_from_auth():
-    auth = request.headers.get("Authorization", "")
-    if not auth:
-        return "demo_user"
-    parts = auth.split()
-    if len(parts) == 2 and parts[0].lower() == "bearer":
-        token = parts[1]
+def detect_extension(filename, mimetype):
+    """Return the lowercase extension from filename, falling back to mimetype."""
+    if filename and "." in filename:
+        return filename.rsplit(".", 1)[1].lower()
+    mime = (mimetype or "").lower()
+    for ext in ("webm", "mp3", "mp4", "wav", "m4a"):
+        if ext in mime:
+            return ext
+    return None
+
+
+def spool_path(upload_id):
+    return os.path.join(SPOOL_DIR, f"{upload_id}.part")
+
+
+def sweep_spool():
+    """Delete resumable-upload spools untouched for UPLOAD_SPOOL_TTL and mark those uploads expired."""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < SPOOL_SWEEP_INTERVAL:
+        return
+    _last_sweep = now
+    for name in os.listdir(SPOOL_DIR):
+        if not name.endswith(".part"):
+            continue
+        path = os.path.join(SPOOL_DIR, name)
         try:
-            payload = jwt.decode(token, Config.JWT_SECRET, algorithms=["HS256"])
-            return str(payload.get("sub", "demo_user"))
-        except Exception:
-            return "demo_user"
-    return "demo_user"
-
-
-def upload_file_to_assemblyai(file_obj):
-    headers = {"authorization": Config.SPEECH_API_KEY}
-    response = requests.post("https://api.assemblyai.com/v2/upload", headers=headers, data=file_obj)
-    response.raise_for_status()
-    return response.json()["upload_url"]
-
+            if now - os.path.getmtime(path) < Config.UPLOAD_SPOOL_TTL:
+                continue
+            os.remove(path)
+        except OSError:
+            continue
+        uploads.update_one(
+            {"_id": name[:-len(".part")], "status": "receiving"},
+            {"$set": {"status": "expired", "progress.stage": "expired"}}
+        )
+        print(f"🧹 [Spool] Expired abandoned upload: {name}")
+
+
+def copy_stream(stream, out, hasher=None, limit=None):
+    """Copy a request body into an open file block by block (constant memory).
+    If `hasher` is given it is fed the same blocks. More than `limit` bytes
+    raises ValueError (what was written stays; the caller truncates)."""
+    written = 0
+    while True:
+        block = stream.read(SPOOL_BLOCK_SIZE)
+        if not block:
+            break
+        if limit is not None and written + len(block) > limit:
+            raise ValueError("body larger than allowed")
+        out.write(block)
+        if hasher is not None:
+            hasher.update(block)
+        written += len(block)
+    return written
+
+
+def lock_spool(f):
+    """Exclusive, non-blocking lock on an open spool file (all web processes on
+    the host). False if another request holds it. Without fcntl: always True."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
 
-# ------------------------------- URL DOWNLOAD HANDLER -------------------------------
 
-def download_audio_from_url(url: str):
-    """Download YouTube or Google Drive audio and return local file path"""
-    unique_name = f"{uuid.uuid4().hex}.mp3"
-    local_path = os.path.join(TEMP_DIR, unique_name)
+# ------------------------------- processing dispatch -------------------------------
 
-    # --- YouTube URL ---
-    if "youtube.com" in url or "youtu.be" in url:
-        print(f"🎧 [Download] Fetching audio from YouTube: {url}")
-        try:
-            subprocess.run(
-                [
-                    os.path.join(os.getcwd(), "venv", "Scripts", "python.exe"),
-                    "-m", "yt_dlp",
-                    "-x", "--audio-format", "mp3",
-                    "-o", local_path,
-                    url
-                ],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return local_path
-        except subprocess.CalledProcessError as e:
-            print("❌ [YouTube Download Error]:", e.stderr)
-            raise Exception(f"yt-dlp failed: {e.stderr}")
-
-    # --- Google Drive URL ---
-    elif "drive.google.com" in url:
-        print(f"🧩 [Download] Fetching audio from Google Drive: {url}")
-        try:
-            file_id_match = re.search(r"/d/([a-zA-Z0-9_-]+)", url)
-            if not file_id_match:
-                raise Exception("Invalid Google Drive URL format")
-            file_id = file_id_match.group(1)
-            download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-
-            with requests.get(download_url, stream=True) as r:
-                r.raise_for_status()
-                with open(local_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            return local_path
-        except Exception as e:
-            raise Exception(f"Google Drive download failed: {e}")
+def start_processing(uid, file_path, user_id, language, background, extract_duration, is_url=False):
+    """Hand a locally stored upload (or a meeting URL) to the pipeline (Celery by default).
+    Downloading and forwarding to the speech provider happen inside the pipeline, not here."""
+    progress.publish(uid, status="uploaded", stage="uploaded", percent=0, extract_duration=extract_duration)
+    if background:
+        process_upload_task.delay(uid, file_path, user_id, language, extract_duration=extract_duration, is_url=is_url)
+        return jsonify({"upload_id": uid}), 201
 
-    else:
-        raise Exception("Unsupported URL source. Only YouTube or Google Drive allowed.")
+    try:
+        note_id = process_upload(
+            uid, file_path, user_id, language=language, is_url=is_url, extract_duration=extract_duration
+        )
+    finally:
+        if not is_url and os.path.exists(file_path):
+            os.remove(file_path)
+    return jsonify({
+        "upload_id": uid,
+        "note_id": str(note_id),
+        "extract_duration": extract_duration
+    }), 201
 
 
 # ------------------------------- main route -------------------------------
@@ -122,58 +152,37 @@ def upload_file():
     # ---------------- handle direct file upload ----------------
     if f:
         # check by filename OR mimetype
-        ext = None
-        if "." in f.filename:
-            ext = f.filename.rsplit(".", 1)[1].lower()
-        else:
-            # fallback to mimetype
-            mime = f.mimetype.lower()
-            if "webm" in mime:
-                ext = "webm"
-            elif "mp3" in mime:
-                ext = "mp3"
-            elif "mp4" in mime:
-                ext = "mp4"
-            elif "wav" in mime:
-                ext = "wav"
-            elif "m4a" in mime:
-                ext = "m4a"
-
+        ext = detect_extension(f.filename, f.mimetype)
         if ext not in ALLOWED:
             print(f"❌ Unsupported file type: {f.filename} ({f.mimetype})")
             return jsonify({"error": "unsupported file type"}), 400
 
         filename = secure_filename(f.filename or f"recording.{ext}")
 
-        # upload to AssemblyAI
-        upload_url = upload_file_to_assemblyai(f)
+        # spool to local storage (hashing as we go); the worker forwards it to the speech provider
+        local_path = os.path.join(Config.UPLOAD_FOLDER, f"{uid}.{ext}")
+        hasher = hashlib.sha256()
+        with open(local_path, "wb") as out:
+            copy_stream(f.stream, out, hasher)
+        audio_sha256 = hasher.hexdigest()
 
     # ---------------- handle meeting / video URL ----------------
+    # only validated here; the worker downloads it (start_upload)
     else:
-        try:
-            print("🌐 [URL Detected] Downloading meeting/video audio...")
-            local_audio_path = download_audio_from_url(url)
-            print(f"✅ [Downloaded] Audio saved locally: {local_audio_path}")
-
-            with open(local_audio_path, "rb") as audio_file:
-                upload_url = upload_file_to_assemblyai(audio_file)
-
-            filename = os.path.basename(local_audio_path)
-
-            # delete local temp file after upload
-            if os.path.exists(local_audio_path):
-                os.remove(local_audio_path)
-
-        except Exception as e:
-            print(f"❌ [Meeting URL Error]: {e}")
-            return jsonify({"error": f"Failed to process meeting URL: {str(e)}"}), 500
+        if not is_supported_url(url):
+            return jsonify({"error": "Unsupported URL source. Only YouTube or Google Drive allowed."}), 400
+        local_path = url
+        filename = url
+        audio_sha256 = None
 
     # ---------------- insert upload info into Mongo ----------------
     uploads.insert_one({
         "_id": uid,
         "user_id": str(user_id),
         "filename": filename,
-        "upload_url": upload_url,
+        "file_path": local_path,
+        "is_url": not f,
+        "audio_sha256": audio_sha256,
         "status": "uploaded",
         "created_at": datetime.utcnow(),
         "progress": {"stage": "uploaded", "percent": 0},
@@ -182,28 +191,214 @@ def upload_file():
     })
 
     # ---------------- trigger processing (sync or background) ----------------
-    if background:
-        process_upload_task.delay(uid, upload_url, user_id, language)
-        return jsonify({"upload_id": uid}), 201
-    else:
-        note_id = process_upload(uid, upload_url, user_id, language=language)
-        return jsonify({
-            "upload_id": uid,
-            "note_id": str(note_id),
-            "extract_duration": extract_duration
-        }), 201
+    return start_processing(uid, local_path, user_id, language, background, extract_duration, is_url=not f)
 
 
-# ------------------------------- check status -------------------------------
+# ------------------------------- chunked / resumable upload -------------------------------
 
-@bp.route("/status/<upload_id>", methods=["GET"])
-def status(upload_id):
-    u = uploads.find_one({"_id": upload_id}, {"status": 1, "note_id": 1, "progress": 1, "extract_duration": 1})
+def get_receiving_upload(upload_id, user_id):
+    u = uploads.find_one({"_id": upload_id})
+    if not u or u.get("user_id") != str(user_id):
+        return None
+    return u
+
+
+@bp.route("/upload/init", methods=["POST"])
+def upload_init():
+    """Start a resumable upload. Chunks are then appended with PUT /upload/<id>/chunk."""
+    user_id = get_user_from_auth()
+    data = request.json or {}
+    sweep_spool()
+
+    ext = detect_extension(data.get("filename"), data.get("mimetype"))
+    if ext not in ALLOWED:
+        return jsonify({"error": "unsupported file type"}), 400
+
+    try:
+        total_size = int(data["size"]) if data.get("size") is not None else None
+        extract_duration = int(data.get("extractDuration") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "size and extractDuration must be integers"}), 400
+
+    uid = str(uuid.uuid4())
+    open(spool_path(uid), "wb").close()
+
+    uploads.insert_one({
+        "_id": uid,
+        "user_id": str(user_id),
+        "filename": secure_filename(data.get("filename") or f"recording.{ext}"),
+        "ext": ext,
+        "status": "receiving",
+        "received_bytes": 0,
+        "total_size": total_size,
+        "created_at": datetime.utcnow(),
+        "progress": {"stage": "receiving", "percent": 0},
+        "language": data.get("language") or "auto",
+        "extract_duration": extract_duration,
+        "background": str(data.get("background", "true")).lower() != "false"
+    })
+    return jsonify({"upload_id": uid, "received": 0}), 201
+
+
+@bp.route("/upload/<upload_id>", methods=["GET"])
+def upload_offset(upload_id):
+    """Report how many bytes the server holds, so a client can resume after a drop."""
+    u = get_receiving_upload(upload_id, get_user_from_auth())
     if not u:
         return jsonify({"error": "not found"}), 404
-    return jsonify({
+    path = spool_path(upload_id)
+    received = os.path.getsize(path) if os.path.exists(path) else u.get("received_bytes", 0)
+    return jsonify({"upload_id": upload_id, "status": u.get("status"), "received": received})
+
+
+@bp.route("/upload/<upload_id>/chunk", methods=["PUT", "POST"])
+def upload_chunk(upload_id):
+    """Append the raw request body at `Upload-Offset` (header) or `?offset=`."""
+    u = get_receiving_upload(upload_id, get_user_from_auth())
+    if not u:
+        return jsonify({"error": "not found"}), 404
+    if u.get("status") == "expired":
+        return jsonify({"error": "upload expired, start again"}), 410
+    if u.get("status") != "receiving":
+        return jsonify({"error": "upload already finalized"}), 409
+
+    try:
+        out = open(spool_path(upload_id), "r+b")
+    except FileNotFoundError:
+        return jsonify({"error": "upload spool missing, start again"}), 410
+
+    with out:
+        # one writer per spool: a retried chunk can arrive while the first
+        # attempt is still streaming at the same offset
+        if not lock_spool(out):
+            received = os.fstat(out.fileno()).st_size
+            return jsonify({"error": "another chunk is still being written", "received": received}), 409
+        if not os.path.exists(spool_path(upload_id)):
+            # /complete moved it away while we waited for the file
+            return jsonify({"error": "upload already finalized"}), 409
+        current = os.fstat(out.fileno()).st_size
+        try:
+            offset = int(request.headers.get("Upload-Offset") or request.args.get("offset", current))
+        except ValueError:
+            return jsonify({"error": "invalid offset"}), 400
+        if offset != current:
+            # client and server disagree: tell the client where to resume from
+            return jsonify({"error": "offset mismatch", "received": current}), 409
+
+        total_size = u.get("total_size")
+        out.seek(offset)
+        try:
+            written = copy_stream(request.stream, out, limit=None if total_size is None else total_size - offset)
+        except ValueError:
+            out.truncate(offset)
+            return jsonify({"error": "chunk goes past the declared size", "received": offset}), 413
+        received = offset + written
+        out.truncate(received)
+
+    uploads.update_one({"_id": upload_id}, {"$set": {"received_bytes": received}})
+    return jsonify({"upload_id": upload_id, "received": received})
+
+
+@bp.route("/upload/<upload_id>/complete", methods=["POST"])
+def upload_complete(upload_id):
+    """Finalize a chunked upload and queue it for processing."""
+    user_id = get_user_from_auth()
+    u = get_receiving_upload(upload_id, user_id)
+    if not u:
+        return jsonify({"error": "not found"}), 404
+    if u.get("status") == "expired":
+        return jsonify({"error": "upload expired, start again"}), 410
+    if u.get("status") != "receiving":
+        return jsonify({"error": "upload already finalized"}), 409
+
+    path = spool_path(upload_id)
+    try:
+        spool = open(path, "rb")
+    except FileNotFoundError:
+        return jsonify({"error": "no data received"}), 400
+    with spool:
+        # moved while locked, so no chunk can still be writing into it
+        if not lock_spool(spool):
+            return jsonify({"error": "a chunk is still being written"}), 409
+        received = os.fstat(spool.fileno()).st_size
+        if not received:
+            return jsonify({"error": "no data received"}), 400
+        if u.get("total_size") is not None and received != u["total_size"]:
+            return jsonify({"error": "upload incomplete", "received": received}), 409
+
+        local_path = os.path.join(Config.UPLOAD_FOLDER, f"{upload_id}.{u['ext']}")
+        os.replace(path, local_path)
+
+    uploads.update_one(
+        {"_id": upload_id},
+        {"$set": {
+            "status": "uploaded",
+            "file_path": local_path,
+            "received_bytes": received,
+            "progress": {"stage": "uploaded", "percent": 0}
+        }}
+    )
+    return start_processing(
+        upload_id, local_path, user_id, u.get("language", "auto"),
+        u.get("background", True), u.get("extract_duration", 0)
+    )
+
+
+# ------------------------------- check status -------------------------------
+
+def status_from_db(upload_id):
+    u = uploads.find_one({"_id": upload_id}, {"status": 1, "note_id": 1, "progress": 1, "extract_duration": 1, "error": 1})
+    if not u:
+        return None
+    state = {
         "status": u.get("status"),
         "note_id": str(u.get("note_id")),
         "progress": u.get("progress", {}),
         "extract_duration": u.get("extract_duration", 0)
-    })
+    }
+    if u.get("error"):
+        state["error"] = u["error"]
+    return state
+
+
+@bp.route("/status/<upload_id>", methods=["GET"])
+def status(upload_id):
+    """Latest progress: Redis snapshot first, Mongo when there is none."""
+    state = progress.get_state(upload_id) or status_from_db(upload_id)
+    if not state:
+        return jsonify({"error": "not found"}), 404
+    state["note_id"] = str(state.get("note_id"))
+    return jsonify(state)
+
+
+@bp.route("/status/<upload_id>/events", methods=["GET"])
+def status_events(upload_id):
+    """
+    Server-sent events: the current state, then every progress change until
+    the upload is done/failed or PROGRESS_STREAM_TIMEOUT passes; the browser's
+    EventSource then reconnects (after `retry`) and picks up the current state.
+    Without Redis, sends the stored state once per connection.
+    """
+    def format_event(state):
+        state["note_id"] = str(state.get("note_id"))
+        return f"event: progress\ndata: {json.dumps(state)}\n\n"
+
+    def generate():
+        yield "retry: 1000\n\n"
+        if progress.get_state(upload_id) is None:
+            # not published yet (or no Redis): start from what Mongo has
+            state = status_from_db(upload_id)
+            if not state:
+                yield f"event: error\ndata: {json.dumps({'error': 'not found'})}\n\n"
+                return
+            yield format_event(state)
+            if state["status"] in progress.FINAL_STATUSES:
+                return
+        for state in progress.iter_events(upload_id):
+            yield ": keep-alive\n\n" if state is None else format_event(state)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify
+from models.mongo_models import uploads
+from core.ai_pipeline import WEBHOOK_AUTH_HEADER
+from core.tasks import check_transcription_task
+from config import Config
+
+bp = Blueprint("webhooks", __name__, url_prefix="/api/webhooks")
+
+
+@bp.route("/assemblyai", methods=["POST"])
+def assemblyai_webhook():
+    """
+    AssemblyAI calls this when a transcript finishes:
+    {"transcript_id": "...", "status": "completed" | "error"}.
+    We only queue a check; the worker fetches the transcript itself.
+    """
+    if Config.WEBHOOK_SECRET and request.headers.get(WEBHOOK_AUTH_HEADER) != Config.WEBHOOK_SECRET:
+        return jsonify({"error": "unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    transcript_id = data.get("transcript_id")
+    if not transcript_id:
+        return jsonify({"error": "transcript_id required"}), 400
+
+    u = uploads.find_one({"transcription.segments.id": transcript_id}, {"_id": 1})
+    if not u:
+        return jsonify({"error": "unknown transcript"}), 404
+
+    print(f"🔔 [Webhook] {transcript_id} → {data.get('status')} (upload {u['_id']})")
+    check_transcription_task.delay(u["_id"], reschedule=False)
+    return jsonify({"ok": True}), 200
@@ -1,24 +1,47 @@
-from flask import Flask, jsonify
+import time
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
 from config import Config
+from core import metrics, auth
 from api.auth import bp as auth_bp
 from api.upload import bp as up_bp
 from api.notes import bp as notes_bp
 from api.health import bp as health_bp
+from api.webhooks import bp as webhooks_bp
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Enable CORS (allow all origins for local testing)
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    # Enable CORS (allow all origins for local testing); browsers may only
+    # read custom response headers that are exposed here
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor"])
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(up_bp)
     app.register_blueprint(notes_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(webhooks_bp)
+
+    # Shared auth: g.user_id from the Bearer token (verified tokens are cached)
+    app.before_request(auth.load_user)
+
+    # Request latency per blueprint (exposed at /api/metrics)
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            metrics.observe(
+                "http_request_seconds", time.perf_counter() - started,
+                blueprint=request.blueprint or "app", method=request.method, status=response.status_code
+            )
+        return response
 
     # ✅ Default route for testing
     @app.route("/", methods=["GET"])
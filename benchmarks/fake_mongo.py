@@ -0,0 +1,269 @@
+"""
+In-memory stand-in for models.mongo_models: the handful of pymongo
+collection methods the app uses, on plain dicts. Not a general Mongo
+emulator; enough for benchmarks and load tests to run without a server.
+"""
+import copy
+import sys
+import threading
+import types
+
+from bson import ObjectId
+
+
+class Result:
+    def __init__(self, inserted_id=None, matched_count=0, modified_count=0, upserted_id=None, deleted_count=0):
+        self.inserted_id = inserted_id
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.deleted_count = deleted_count
+
+
+def _values(doc, path):
+    """All values at a dotted path; arrays are traversed (and their elements
+    matched individually) like Mongo does."""
+    current = [doc]
+    for part in path.split("."):
+        nxt = []
+        for value in current:
+            if isinstance(value, dict):
+                if part in value:
+                    nxt.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    nxt.extend(value[int(part):int(part) + 1])
+                else:
+                    nxt.extend(v[part] for v in value if isinstance(v, dict) and part in v)
+        current = nxt
+    out = []
+    for value in current:
+        out.append(value)
+        if isinstance(value, list):
+            out.extend(value)
+    return out
+
+
+def _compare(op, values, arg):
+    if op == "$exists":
+        return bool(values) == bool(arg)
+    if op == "$ne":
+        return arg not in (values or [None])
+    if op == "$nin":
+        return not any(v in arg for v in (values or [None]))
+    if op == "$in":
+        return any(v in arg for v in (values or [None]))
+    checks = {"$gt": lambda v: v > arg, "$gte": lambda v: v >= arg,
+              "$lt": lambda v: v < arg, "$lte": lambda v: v <= arg, "$eq": lambda v: v == arg}
+    if op not in checks:
+        raise NotImplementedError(f"fake_mongo: operator {op}")
+    for v in values or []:
+        try:
+            if v is not None and checks[op](v):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+            continue
+        values = _values(doc, key)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not all(_compare(op, values, arg) for op, arg in cond.items()):
+                return False
+        elif cond not in (values or [None]):
+            return False
+    return True
+
+
+def _set_path(doc, path, value, unset=False):
+    parts = path.split(".")
+    targets = [doc]
+    for part in parts[:-1]:
+        nxt = []
+        for t in targets:
+            if part == "$[]":
+                nxt.extend(x for x in t if isinstance(x, dict))
+            elif isinstance(t, list):
+                nxt.append(t[int(part)])
+            else:
+                nxt.append(t.setdefault(part, {}) if not unset else t.get(part, {}))
+        targets = nxt
+    last = parts[-1]
+    for t in targets:
+        if isinstance(t, list):
+            t[int(last)] = value
+        elif unset:
+            t.pop(last, None)
+        else:
+            t[last] = value
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v}
+    if not include:
+        out = copy.deepcopy(doc)
+        for k in projection:
+            _set_path(out, k, None, unset=True)
+        return out
+    out = {"_id": doc["_id"]} if projection.get("_id", 1) else {}
+    for path in include - {"_id"}:
+        head = path.split(".")[0]
+        if head in doc:
+            out[head] = copy.deepcopy(doc[head])
+    return out
+
+
+def _sort_key(doc, key):
+    # missing fields sort first, like null in Mongo
+    values = _values(doc, key)
+    return (True, values[0]) if values and values[0] is not None else (False, 0)
+
+
+class Cursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        docs = self._docs
+        for key, direction in reversed(self._sort):
+            docs = sorted(docs, key=lambda d: _sort_key(d, key), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return iter([_project(d, self._projection) for d in docs])
+
+
+class Collection:
+    def __init__(self, name):
+        self.name = name
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        return "fake_index"
+
+    def insert_one(self, doc):
+        with self._lock:
+            doc.setdefault("_id", ObjectId())
+            self._docs[doc["_id"]] = copy.deepcopy(doc)
+            return Result(inserted_id=doc["_id"])
+
+    def insert_many(self, docs):
+        return [self.insert_one(d).inserted_id for d in docs]
+
+    def _match(self, query):
+        if set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc is not None else []
+        return [d for d in self._docs.values() if matches(d, query)]
+
+    def find_one(self, query=None, projection=None):
+        with self._lock:
+            found = self._match(query or {})
+            return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            return Cursor(list(self._match(query or {})), projection)
+
+    def count_documents(self, query):
+        with self._lock:
+            return len(self._match(query))
+
+    def _apply(self, doc, update):
+        for op, fields in update.items():
+            for path, value in fields.items():
+                if op == "$set":
+                    _set_path(doc, path, copy.deepcopy(value))
+                elif op == "$unset":
+                    _set_path(doc, path, None, unset=True)
+                elif op == "$inc":
+                    current = (_values(doc, path) or [0])[0]
+                    _set_path(doc, path, current + value)
+                elif op == "$setOnInsert":
+                    continue
+                else:
+                    raise NotImplementedError(f"fake_mongo: update operator {op}")
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            found = self._match(query)
+            if found:
+                self._apply(found[0], update)
+                return Result(matched_count=1, modified_count=1)
+            if not upsert:
+                return Result()
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            doc.setdefault("_id", ObjectId())
+            self._apply(doc, update)
+            for path, value in update.get("$setOnInsert", {}).items():
+                _set_path(doc, path, copy.deepcopy(value))
+            self._docs[doc["_id"]] = doc
+            return Result(upserted_id=doc["_id"])
+
+    def update_many(self, query, update):
+        with self._lock:
+            found = self._match(query)
+            for doc in found:
+                self._apply(doc, update)
+            return Result(matched_count=len(found), modified_count=len(found))
+
+    def delete_one(self, query):
+        with self._lock:
+            found = self._match(query)
+            if found:
+                del self._docs[found[0]["_id"]]
+            return Result(deleted_count=len(found[:1]))
+
+
+class Database:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, Collection(name))
+
+    __getitem__ = __getattr__
+
+
+def install():
+    """Register the in-memory database as models.mongo_models; call before importing the app."""
+    db = Database()
+    module = types.ModuleType("models.mongo_models")
+    module.db = db
+    for name in ("users", "notes", "uploads", "transcripts", "note_transcripts", "search_index"):
+        setattr(module, name, getattr(db, name))
+    import models
+    models.mongo_models = module
+    sys.modules["models.mongo_models"] = module
+    return module
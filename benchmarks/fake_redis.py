@@ -0,0 +1,172 @@
+"""
+In-memory stand-in for the Redis client returned by core.redis_client.get_redis:
+strings with TTL, hashes, pipelines and pub/sub, which is what the LLM cache,
+progress events and metrics use. Values come back as bytes like redis-py.
+"""
+import os
+import queue
+import threading
+import time
+
+
+def _b(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class FakePubSub:
+    def __init__(self, server, ignore_subscribe_messages=False):
+        self.server = server
+        self.queue = queue.Queue()
+        self.channels = set()
+
+    def subscribe(self, *channels):
+        with self.server.lock:
+            for channel in channels:
+                self.channels.add(channel)
+                self.server.subscribers.setdefault(channel, set()).add(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self.server.lock:
+            for channel in self.channels:
+                self.server.subscribers.get(channel, set()).discard(self)
+            self.channels.clear()
+
+
+class FakePipeline:
+    def __init__(self, server):
+        self.server = server
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.server, name)
+
+        def queued(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+        return queued
+
+    def execute(self):
+        # one lock for the whole batch, like MULTI/EXEC
+        with self.server.lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = {}        # key -> bytes | dict[bytes, bytes]
+        self.expires = {}     # key -> unix time
+        self.subscribers = {}
+
+    def _live(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    # strings
+    def get(self, key):
+        with self.lock:
+            return self._live(key)
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.data[key] = _b(value)
+            self.expires.pop(key, None)
+            if ex:
+                self.expires[key] = time.time() + ex
+            return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        with self.lock:
+            removed = sum(1 for k in keys if self.data.pop(k, None) is not None)
+            for k in keys:
+                self.expires.pop(k, None)
+            return removed
+
+    def expire(self, key, seconds):
+        with self.lock:
+            if self._live(key) is None:
+                return False
+            self.expires[key] = time.time() + seconds
+            return True
+
+    def ttl(self, key):
+        with self.lock:
+            if self._live(key) is None:
+                return -2
+            expires_at = self.expires.get(key)
+            return -1 if expires_at is None else max(0, int(expires_at - time.time()))
+
+    # hashes
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self.lock:
+            h = self._live(key)
+            if h is None:
+                h = self.data[key] = {}
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            added = 0
+            for f, v in items.items():
+                added += _b(f) not in h
+                h[_b(f)] = _b(v)
+            return added
+
+    def hget(self, key, field):
+        with self.lock:
+            return (self._live(key) or {}).get(_b(field))
+
+    def hgetall(self, key):
+        with self.lock:
+            return dict(self._live(key) or {})
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        with self.lock:
+            h = self._live(key)
+            if h is None:
+                h = self.data[key] = {}
+            value = float(h.get(_b(field), b"0")) + amount
+            h[_b(field)] = _b(repr(value))
+            return value
+
+    # pub/sub
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for sub in subscribers:
+            sub.queue.put({"type": "message", "channel": _b(channel), "data": _b(message)})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self, ignore_subscribe_messages)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ping(self):
+        return True
+
+
+def install():
+    """Make core.redis_client.get_redis() hand out one shared in-memory client."""
+    from core import redis_client
+    client = FakeRedis()
+    with redis_client._lock:
+        redis_client._client = client
+        redis_client._client_pid = os.getpid()
+    return client
@@ -0,0 +1,130 @@
+"""
+Wire the app to local stand-ins: stub providers over HTTP, in-memory Mongo,
+and optionally an in-memory Redis (otherwise Redis is switched off) and a
+thread-pool "Celery worker". Must run before anything imports `config`,
+since Config reads the environment once at import.
+"""
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fake_mongo
+from benchmarks.stubs import StubState, StubTranslator, start_stub_server
+
+
+class Harness:
+    def __init__(self, base_url, server, state, mongo, workdir):
+        self.base_url = base_url
+        self.server = server
+        self.state = state
+        self.mongo = mongo
+        self.workdir = workdir
+
+    def reset(self):
+        """Forget transcripts, uploads and notes between runs (so caches don't hide work)."""
+        for name in ("uploads", "notes", "transcripts", "note_transcripts", "search_index"):
+            getattr(self.mongo, name)._docs.clear()
+        from core import translation, llm_cache, search
+        with translation._lock:
+            translation._cache.clear()
+        llm_cache.clear_local()
+        with search._lock:
+            search._indexes.clear()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def setup(stub_options=None, env=None, fake_redis=False, stub_media=False):
+    if "config" in sys.modules:
+        raise RuntimeError("benchmarks.harness.setup() must run before `config` is imported")
+
+    base_url, server, state = start_stub_server(StubState(**(stub_options or {})))
+    workdir = tempfile.mkdtemp(prefix="ttt-bench-")
+    os.environ.update({
+        "ASSEMBLYAI_BASE_URL": base_url,
+        "GROQ_BASE_URL": f"{base_url}/openai/v1",
+        "SPEECH_API_KEY": "stub",
+        "LLM_API_KEY": "stub",
+        "JWT_SECRET": os.environ.get("JWT_SECRET") or "bench-secret",
+        "UPLOAD_FOLDER": os.path.join(workdir, "uploads"),
+        "EXPORT_CACHE_DIR": "",
+        "AUDIO_PREPROCESS": "false",
+        "SEGMENTED_TRANSCRIPTION": "false",
+        "PRERENDER_EXPORTS": "false",
+        "LLM_CACHE_ENABLED": "false",
+        "REDIS_URL": "redis://in-memory" if fake_redis else "",
+        "SEARCH_BACKEND": "memory",
+    })
+    os.environ.update(env or {})
+
+    mongo = fake_mongo.install()
+    if fake_redis:
+        from benchmarks import fake_redis as fake_redis_module
+        fake_redis_module.install()
+
+    # googletrans → stub endpoint, one client per thread like the real one
+    from core import translation, ai_pipeline
+    local = threading.local()
+
+    def get_translator():
+        if not hasattr(local, "translator"):
+            local.translator = StubTranslator(base_url)
+        return local.translator
+
+    translation.get_translator = get_translator
+    # stub jobs finish in a fraction of a second; don't sleep the real backoff
+    ai_pipeline.POLL_BASE_DELAY = 0.05
+    ai_pipeline.POLL_MAX_DELAY = 0.5
+    if stub_media:
+        # stub "audio" isn't decodable; skip ffmpeg/ffprobe extraction
+        ai_pipeline.extract_audio = lambda src, duration=None: src
+
+    return Harness(base_url, server, state, mongo, workdir)
+
+
+class LocalWorker:
+    """
+    Runs Celery tasks on a thread pool in this process (delay / apply_async
+    with countdown), standing in for `celery worker --concurrency=N`.
+    """
+
+    def __init__(self, concurrency):
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="worker")
+        self.queued = 0
+
+    def submit(self, task, args=(), kwargs=None, countdown=0):
+        def run():
+            try:
+                task.run(*args, **(kwargs or {}))
+            except Exception as e:
+                print(f"⚠️ [LocalWorker] {task.name}: {e}")
+
+        self.queued += 1
+        if countdown:
+            timer = threading.Timer(countdown, self.pool.submit, (run,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.pool.submit(run)
+
+    def install(self, *tasks):
+        for task in tasks:
+            task.delay = lambda *args, _task=task, **kwargs: self.submit(_task, args, kwargs)
+            task.apply_async = (
+                lambda args=(), kwargs=None, countdown=0, _task=task, **options:
+                self.submit(_task, args, kwargs, countdown)
+            )
+        return self
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def install_local_worker(concurrency=4):
+    from core import tasks
+    return LocalWorker(concurrency).install(
+        tasks.process_upload_task, tasks.check_transcription_task, tasks.render_exports_task
+    )
@@ -0,0 +1,349 @@
+"""
+HTTP load generator driven by scenario files (benchmarks/scenarios/*.json).
+
+    python -m benchmarks.load benchmarks/scenarios/mixed.json
+    python -m benchmarks.load benchmarks/scenarios/status_polling.json --users 50 --duration 30
+    python -m benchmarks.load benchmarks/scenarios/mixed.json --target http://staging:8000
+
+Without --target the app is started in this process (threaded WSGI server)
+against the stub providers, in-memory Mongo and Redis, and a thread-pool
+stand-in for the Celery worker (`worker_concurrency`). With --target an
+already running deployment (e.g. gunicorn + Celery) is loaded instead.
+
+Reports per-endpoint throughput, error rate, latency percentiles and a
+latency histogram; the full report goes to benchmarks/results/load-<name>.json.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+# histogram bucket upper bounds (ms)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# bytes of fake "audio" per minute (~32 kbps speech)
+AUDIO_BYTES_PER_MINUTE = 240 * 1024
+
+DEFAULTS = {
+    "name": "scenario",
+    "duration": 60,
+    "users": 10,
+    "ramp_up": 5,
+    "think_time": [0.1, 0.5],
+    "seed_notes": 30,
+    "upload_minutes": [1],
+    "revalidate_ratio": 0.0,
+    "bulk_export_size": 10,
+    "worker_concurrency": 4,
+    "stub": {},
+    "mix": {"status": 1},
+}
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}   # endpoint -> [seconds]
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint, seconds, status):
+        error = status is None or status >= 400
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + int(error)
+            codes = self.statuses.setdefault(endpoint, {})
+            key = str(status) if status is not None else "exception"
+            codes[key] = codes.get(key, 0) + 1
+
+    def report(self, elapsed):
+        out = {}
+        with self.lock:
+            for endpoint, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+                histogram, start = {}, 0
+                for bound in BUCKETS_MS:
+                    end = start
+                    while end < len(ordered) and ordered[end] * 1000 <= bound:
+                        end += 1
+                    histogram[f"<={bound}ms"] = end - start
+                    start = end
+                histogram[f">{BUCKETS_MS[-1]}ms"] = len(ordered) - start
+                out[endpoint] = {
+                    "requests": len(values),
+                    "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+                    "error_rate": self.errors[endpoint] / len(values),
+                    "statuses": self.statuses[endpoint],
+                    "mean_ms": statistics.fmean(values) * 1000,
+                    "p50_ms": percentile(ordered, 50) * 1000,
+                    "p90_ms": percentile(ordered, 90) * 1000,
+                    "p99_ms": percentile(ordered, 99) * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                    "histogram": histogram,
+                }
+        return out
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Context:
+    """State shared by all virtual users: auth, known uploads/notes, stats."""
+
+    def __init__(self, base_url, scenario, token):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.stats = Stats()
+        self.lock = threading.Lock()
+        self.note_ids = []
+        self.upload_ids = []
+        self.etags = {}
+
+    def remember(self, note_ids=(), upload_ids=()):
+        with self.lock:
+            known = set(self.note_ids)
+            self.note_ids += [n for n in note_ids if n and n != "None" and n not in known]
+            self.upload_ids += list(upload_ids)
+
+    def pick(self, attr, rng):
+        with self.lock:
+            items = getattr(self, attr)
+            return rng.choice(items) if items else None
+
+
+class VirtualUser:
+    def __init__(self, ctx, index):
+        import requests
+        self.ctx = ctx
+        self.rng = random.Random(index)
+        self.session = requests.Session()
+        self.pending = []   # uploads this user is still polling
+
+    def call(self, endpoint, method, path, **kwargs):
+        headers = dict(self.ctx.headers, **kwargs.pop("headers", {}))
+        started = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.ctx.base_url + path, headers=headers, timeout=60, **kwargs)
+            # downloads/exports: time the whole body, not just the headers
+            _ = resp.content
+            status = resp.status_code
+        except Exception:
+            resp, status = None, None
+        self.ctx.stats.record(endpoint, time.perf_counter() - started, status)
+        return resp
+
+    # --- actions ---
+    def upload(self):
+        minutes = self.rng.choice(self.ctx.scenario["upload_minutes"])
+        payload = f"MINUTES {minutes}\n".encode("utf-8") + os.urandom(int(minutes * AUDIO_BYTES_PER_MINUTE))
+        resp = self.call(
+            "POST /api/upload", "POST", "/api/upload",
+            files={"file": ("meeting.mp3", payload, "audio/mpeg")}, data={"language": "en"},
+        )
+        if resp is not None and resp.status_code == 201:
+            self.pending.append(resp.json()["upload_id"])
+
+    def status(self):
+        upload_id = self.rng.choice(self.pending) if self.pending else self.ctx.pick("upload_ids", self.rng)
+        if not upload_id:
+            return self.history()
+        resp = self.call("GET /api/status/<id>", "GET", f"/api/status/{upload_id}")
+        if resp is None or resp.status_code != 200 or upload_id not in self.pending:
+            return
+        data = resp.json()
+        if data.get("status") in ("done", "failed"):
+            self.pending.remove(upload_id)
+            self.ctx.remember(note_ids=[data.get("note_id")], upload_ids=[upload_id])
+
+    def history(self):
+        resp = self.call("GET /api/history", "GET", "/api/history")
+        if resp is not None and resp.status_code == 200:
+            self.ctx.remember(note_ids=[item["note_id"] for item in resp.json()])
+
+    def download(self, fmt):
+        note_id = self.ctx.pick("note_ids", self.rng)
+        if not note_id:
+            return self.history()
+        headers = {}
+        etag = self.ctx.etags.get((note_id, fmt))
+        if etag and self.rng.random() < self.ctx.scenario["revalidate_ratio"]:
+            headers["If-None-Match"] = etag
+        resp = self.call(f"GET /api/download/{fmt}/<id>", "GET", f"/api/download/{fmt}/{note_id}", headers=headers)
+        if resp is not None and resp.headers.get("ETag"):
+            self.ctx.etags[(note_id, fmt)] = resp.headers["ETag"]
+
+    def bulk_export(self):
+        with self.ctx.lock:
+            ids = list(self.ctx.note_ids)
+        if not ids:
+            return self.history()
+        chosen = self.rng.sample(ids, min(len(ids), self.ctx.scenario["bulk_export_size"]))
+        self.call("POST /api/export/bulk", "POST", "/api/export/bulk", json={"note_ids": chosen, "format": "pdf"})
+
+    def run(self, deadline):
+        actions = {
+            "upload": self.upload,
+            "status": self.status,
+            "history": self.history,
+            "download_pdf": lambda: self.download("pdf"),
+            "download_docx": lambda: self.download("docx"),
+            "bulk_export": self.bulk_export,
+        }
+        mix = {k: v for k, v in self.ctx.scenario["mix"].items() if v > 0}
+        names, weights = list(mix), list(mix.values())
+        low, high = self.ctx.scenario["think_time"]
+        while time.time() < deadline:
+            actions[self.rng.choices(names, weights)[0]]()
+            time.sleep(self.rng.uniform(low, high))
+
+
+def login(base_url):
+    """Register (or log in as) a dedicated load-test account → JWT."""
+    import requests
+    creds = {"email": f"loadtest+{uuid.uuid4().hex[:8]}@example.com", "password": "load-test-password"}
+    r = requests.post(f"{base_url}/api/auth/register", json=dict(creds, name="Load Test", phone="0000000000"))
+    if r.status_code != 201:
+        r = requests.post(f"{base_url}/api/auth/login", json=creds)
+    r.raise_for_status()
+    data = r.json()
+    return data["token"], data["user"]["id"]
+
+
+def seed(h, user_id, count):
+    """Notes and finished uploads for the load-test user (in-process mode only)."""
+    from benchmarks.run import notes_for
+    from core.notes_parser import parse_notes
+    from models.mongo_models import notes, uploads
+    note_ids, upload_ids = [], []
+    now = datetime.utcnow()
+    for i in range(count):
+        text = notes_for(1 + i % 30)
+        res = notes.insert_one({
+            "user_id": user_id,
+            "final_notes": text,
+            "notes_tree": parse_notes(text),
+            "created_at": now - timedelta(minutes=i),
+        })
+        upload_id = f"seed-{i}"
+        uploads.insert_one({
+            "_id": upload_id, "user_id": user_id, "status": "done", "note_id": str(res.inserted_id),
+            "progress": {"stage": "done", "percent": 100}, "created_at": now,
+        })
+        note_ids.append(str(res.inserted_id))
+        upload_ids.append(upload_id)
+    return note_ids, upload_ids
+
+
+def start_local_app(scenario):
+    """App + stand-ins in this process → (base_url, shutdown)."""
+    from benchmarks import harness
+    h = harness.setup(stub_options=scenario["stub"], fake_redis=True, stub_media=True)
+    worker = harness.install_local_worker(scenario["worker_concurrency"])
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown():
+        server.shutdown()
+        worker.shutdown()
+        h.close()
+
+    return f"http://127.0.0.1:{server.server_port}", h, shutdown
+
+
+def print_report(name, report, elapsed):
+    print(f"\n📊 {name}: {elapsed:.1f}s")
+    print(f"{'endpoint':<30} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for endpoint, r in report.items():
+        print(f"{endpoint:<30} {r['requests']:>7} {r['throughput_rps']:>8.1f} {r['error_rate'] * 100:>5.1f}% "
+              f"{r['p50_ms']:>7.1f}ms {r['p90_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms")
+    for endpoint, r in report.items():
+        peak = max(r["histogram"].values()) or 1
+        print(f"\n{endpoint}")
+        for bucket, count in r["histogram"].items():
+            print(f"  {bucket:>9} {count:>7} {'█' * int(40 * count / peak)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TalkToText HTTP load test")
+    parser.add_argument("scenario", help="scenario JSON file (see benchmarks/scenarios/)")
+    parser.add_argument("--target", help="base URL of a running deployment instead of the in-process app")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own log output")
+    args = parser.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = dict(DEFAULTS, **json.load(f))
+    if args.users:
+        scenario["users"] = args.users
+    if args.duration:
+        scenario["duration"] = args.duration
+
+    shutdown = None
+    # the app logs every request with print(); keep the report readable
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    real_stdout = sys.stdout
+    with quiet:
+        if args.target:
+            base_url = args.target.rstrip("/")
+            token, _ = login(base_url)
+            ctx = Context(base_url, scenario, token)
+        else:
+            base_url, h, shutdown = start_local_app(scenario)
+            token, user_id = login(base_url)
+            ctx = Context(base_url, scenario, token)
+            note_ids, upload_ids = seed(h, user_id, scenario["seed_notes"])
+            ctx.remember(note_ids=note_ids, upload_ids=upload_ids)
+
+        print(f"🚦 {scenario['name']}: {scenario['users']} users for {scenario['duration']}s against {base_url}",
+              file=real_stdout)
+        started = time.time()
+        deadline = started + scenario["ramp_up"] + scenario["duration"]
+        threads = []
+        for i in range(scenario["users"]):
+            vu = VirtualUser(ctx, i)
+            t = threading.Thread(target=vu.run, args=(deadline,), daemon=True)
+            threads.append(t)
+            t.start()
+            time.sleep(scenario["ramp_up"] / max(1, scenario["users"]))
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+        if shutdown:
+            shutdown()
+
+    report = ctx.stats.report(elapsed)
+    print_report(scenario["name"], report, elapsed)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"load-{scenario['name']}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "scenario": scenario,
+            "target": args.target or "in-process",
+            "created_at": datetime.utcnow().isoformat(),
+            "elapsed_seconds": elapsed,
+            "endpoints": report,
+        }, f, indent=2)
+    print(f"\n💾 Report saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
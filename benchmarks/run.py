@@ -0,0 +1,203 @@
+"""
+Offline benchmark suite: no network, no Mongo/Redis/Celery.
+
+    python -m benchmarks.run                  # run, compare with benchmarks/baseline.json
+    python -m benchmarks.run --quick          # 1/5/15 minute transcripts only
+    python -m benchmarks.run --only clean_text,process_upload,search
+    python -m benchmarks.run --save-baseline  # record this run as the new baseline
+    python -m benchmarks.run --check          # exit 1 if anything regressed
+
+Results of the last run go to benchmarks/results/latest.json. Token counts use
+tiktoken's cl100k_base; point TOKENIZER_PATH at a local tokenizer.json if the
+encoding isn't cached on this machine, or estimates are used instead.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import harness
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results", "latest.json")
+# slower than baseline by more than this fraction = regression
+TOLERANCE = 0.25
+# bytes of fake "audio" per minute (~32 kbps speech)
+AUDIO_BYTES_PER_MINUTE = 240 * 1024
+# notes for one user in the search benchmark
+SEARCH_NOTES = 2000
+
+
+def measure(fn, repeat, setup=None):
+    """Run fn `repeat` times (after one warm-up); seconds per run."""
+    if setup:
+        setup()
+    fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "runs": repeat,
+    }
+
+
+def notes_for(minutes):
+    """Markdown notes that grow with the meeting, for the export renderers."""
+    from benchmarks.stubs import CANNED_NOTES
+    extra = "\n".join(f"- Point {i}: follow up on item {i} with the owning team." for i in range(4 * int(minutes)))
+    return CANNED_NOTES.replace("## Action Items", extra + "\n\n## Action Items")
+
+
+def write_audio(h, minutes, name):
+    path = os.path.join(h.workdir, f"{name}.bin")
+    with open(path, "wb") as f:
+        f.write(f"MINUTES {minutes}\n".encode("utf-8"))
+        f.write(os.urandom(int(minutes * AUDIO_BYTES_PER_MINUTE)))
+    return path
+
+
+def bench_process_upload(h, minutes, language):
+    from core.ai_pipeline import process_upload
+    from models.mongo_models import uploads
+    path = write_audio(h, minutes, f"meeting-{minutes}")
+    counter = {"n": 0}
+
+    def run():
+        counter["n"] += 1
+        upload_id = f"bench-{minutes}-{counter['n']}"
+        uploads.insert_one({"_id": upload_id, "user_id": "bench", "status": "uploaded"})
+        process_upload(upload_id, path, "bench", language=language)
+
+    return run
+
+
+def bench_search(notes_count=SEARCH_NOTES):
+    """Ranked search for one user with `notes_count` notes (index built in setup, untimed)."""
+    from core import search
+    from models.mongo_models import search_index
+    from benchmarks.transcripts import make_transcript
+
+    def seed():
+        if search_index.count_documents({"user_id": "bench-search"}):
+            return
+        for i in range(notes_count):
+            search.index_note(f"search-{i}", "bench-search", notes_for(1 + i % 30),
+                              make_transcript(5, seed=i), datetime.utcnow())
+
+    def run():
+        search.search("bench-search", "vendor contract blocked on legal", limit=20)
+
+    return run, seed
+
+
+def build_suite(h, durations, only=None):
+    from core.utils import clean_text, optimize_for_tokens, translate_text, export_to_pdf, export_to_docx
+    from benchmarks.transcripts import make_transcript
+
+    suite = {}
+    for minutes in durations:
+        text = make_transcript(minutes)
+        notes = notes_for(minutes)
+        suite[f"clean_text/{minutes}min"] = (lambda t=text: clean_text(t), None)
+        suite[f"optimize_for_tokens/{minutes}min"] = (lambda t=text: optimize_for_tokens(t, 3000), None)
+        suite[f"translate_text/{minutes}min"] = (lambda t=text: translate_text(t, src="es"), h.reset)
+        suite[f"export_to_pdf/{minutes}min"] = (lambda n=notes: export_to_pdf(n), None)
+        suite[f"export_to_docx/{minutes}min"] = (lambda n=notes: export_to_docx(n), None)
+        suite[f"process_upload/{minutes}min/en"] = (bench_process_upload(h, minutes, "en"), h.reset)
+        suite[f"process_upload/{minutes}min/es"] = (bench_process_upload(h, minutes, "es"), h.reset)
+    suite[f"search/{SEARCH_NOTES}notes"] = bench_search()
+    if only:
+        suite = {k: v for k, v in suite.items() if k.split("/")[0] in only}
+    return suite
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline medians; return the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<38} {'median':>10} {'baseline':>10} {'change':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<38} {r['median'] * 1000:>8.1f}ms {'—':>10} {'new':>8}")
+            continue
+        change = r["median"] / base["median"] - 1 if base["median"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  ⚠️ regression"
+        print(f"{name:<38} {r['median'] * 1000:>8.1f}ms {base['median'] * 1000:>8.1f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TalkToText offline benchmarks")
+    parser.add_argument("--quick", action="store_true", help="short transcripts only (1, 5, 15 min)")
+    parser.add_argument("--only", help="comma-separated benchmark groups, e.g. clean_text,process_upload")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub Groq latency (s)")
+    parser.add_argument("--transcribe-latency", type=float, default=0.2, help="stub AssemblyAI job time (s)")
+    args = parser.parse_args(argv)
+
+    h = harness.setup(stub_options={
+        "llm_seconds": args.llm_latency,
+        "transcribe_seconds": args.transcribe_latency,
+    })
+    from benchmarks.transcripts import DURATIONS
+    durations = DURATIONS[:3] if args.quick else DURATIONS
+    only = set(args.only.split(",")) if args.only else None
+
+    results = {}
+    try:
+        for name, (fn, setup) in build_suite(h, durations, only).items():
+            # full pipeline runs are slow at 60-120 min; fewer repeats there
+            repeat = max(1, args.repeat // 2) if name.startswith("process_upload") else args.repeat
+            results[name] = measure(fn, repeat, setup)
+            print(f"⏱️  {name:<38} {results[name]['median'] * 1000:>9.1f}ms")
+    finally:
+        h.close()
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub": {"llm_seconds": args.llm_latency, "transcribe_seconds": args.transcribe_latency},
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    regressions = []
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {BASELINE_PATH}")
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
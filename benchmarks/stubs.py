@@ -0,0 +1,163 @@
+"""
+Local stand-ins for the outside services, served over real HTTP so the
+shared client, retries and JSON handling are part of what gets measured:
+
+  POST /v2/upload, POST /v2/transcript, GET /v2/transcript/<id>   AssemblyAI
+  POST /openai/v1/chat/completions                                 Groq
+  POST /translate                                                  googletrans (via StubTranslator)
+
+Uploaded "audio" is a text file whose first line is `MINUTES <n>`; the
+transcript returned for it is a synthetic meeting of that length.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import requests
+
+from benchmarks.transcripts import make_transcript
+
+CANNED_NOTES = """## Abstract Summary
+- The team reviewed the release plan, open risks and next steps.
+
+## Key Points
+- Release candidate is on track for the end of the sprint.
+- Two integration risks need owners.
+
+## Action Items
+1. Alice – finalize the rollout checklist – Friday
+2. Bob – confirm vendor timelines – Wednesday
+
+## Sentiment
+- Constructive and focused.
+"""
+
+
+class StubState:
+    def __init__(self, transcribe_seconds=0.2, llm_seconds=0.05, translate_seconds=0.01, error_rate=0.0):
+        self.transcribe_seconds = transcribe_seconds
+        self.llm_seconds = llm_seconds
+        self.translate_seconds = translate_seconds
+        self.error_rate = error_rate
+        self.files = {}        # upload id -> minutes
+        self.jobs = {}         # transcript id -> (ready_at, minutes, language)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return self.counts[name]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None   # set per server
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, payload, status=200):
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _fail_sometimes(self, name):
+        # every 1/error_rate-th call answers 503, to exercise retries
+        rate = self.state.error_rate
+        if rate and self.state.count(name + ":errors") % max(1, int(1 / rate)) == 0:
+            self._json({"error": "stub overload"}, 503)
+            return True
+        return False
+
+    def do_POST(self):
+        body = self._body()
+        if self.path == "/v2/upload":
+            first_line = body.split(b"\n", 1)[0].decode("utf-8", "ignore").split()
+            minutes = float(first_line[1]) if len(first_line) == 2 and first_line[0] == "MINUTES" else 1.0
+            file_id = uuid.uuid4().hex
+            self.state.files[file_id] = minutes
+            host = self.headers.get("Host")
+            return self._json({"upload_url": f"http://{host}/files/{file_id}"})
+
+        if self.path == "/v2/transcript":
+            data = json.loads(body or b"{}")
+            file_id = data.get("audio_url", "").rsplit("/", 1)[-1]
+            transcript_id = uuid.uuid4().hex
+            self.state.jobs[transcript_id] = (
+                time.time() + self.state.transcribe_seconds,
+                self.state.files.get(file_id, 1.0),
+                data.get("language_code") or "en",
+            )
+            return self._json({"id": transcript_id, "status": "queued"})
+
+        if self.path == "/openai/v1/chat/completions":
+            if self._fail_sometimes("llm"):
+                return
+            data = json.loads(body or b"{}")
+            time.sleep(self.state.llm_seconds)
+            prompt_chars = sum(len(m.get("content", "")) for m in data.get("messages", []))
+            return self._json({
+                "choices": [{"message": {"role": "assistant", "content": CANNED_NOTES}}],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(CANNED_NOTES) // 4,
+                    "total_tokens": (prompt_chars + len(CANNED_NOTES)) // 4,
+                },
+            })
+
+        if self.path == "/translate":
+            data = json.loads(body or b"{}")
+            time.sleep(self.state.translate_seconds)
+            return self._json({"text": data.get("text", "")})
+
+        self._json({"error": "not found"}, 404)
+
+    def do_GET(self):
+        if self.path.startswith("/v2/transcript/"):
+            job = self.state.jobs.get(self.path.rsplit("/", 1)[-1])
+            if not job:
+                return self._json({"error": "transcript not found"}, 404)
+            ready_at, minutes, language = job
+            if time.time() < ready_at:
+                return self._json({"status": "processing"})
+            return self._json({
+                "status": "completed",
+                "text": make_transcript(minutes),
+                "language_code": language,
+                "words": [],
+            })
+        self._json({"error": "not found"}, 404)
+
+
+def start_stub_server(state=None, host="127.0.0.1", port=0):
+    """Start the stub providers on a background thread → (base_url, server, state)."""
+    state = state or StubState()
+    handler = type("StubHandler", (Handler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}", server, state
+
+
+class StubTranslator:
+    """Drop-in for googletrans.Translator that calls the stub /translate endpoint."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def translate(self, text, src="auto", dest="en"):
+        r = self.session.post(f"{self.base_url}/translate", json={"text": text, "src": src, "dest": dest})
+        r.raise_for_status()
+        return SimpleNamespace(text=r.json()["text"], src=src, dest=dest)
@@ -0,0 +1,42 @@
+"""Deterministic synthetic meeting transcripts of a given length."""
+import random
+from functools import lru_cache
+
+# Conversational speech runs at roughly 130-160 words per minute
+WORDS_PER_MINUTE = 145
+DURATIONS = (1, 5, 15, 30, 60, 120)
+
+SPEAKERS = ["Alice", "Bob", "Priya", "Omar", "Mei"]
+OPENERS = ["So", "Okay", "Right", "Um", "Yeah", "Well", "And", "Basically"]
+FILLERS = ["um", "uh", "you know", "like"]
+SUBJECTS = ["the release", "the migration", "the budget", "our onboarding flow", "the vendor contract",
+            "the dashboard", "customer feedback", "the API latency", "the hiring plan", "the roadmap"]
+VERBS = ["needs another review", "is slipping by a week", "looks good to me", "should land on Friday",
+         "depends on the data team", "is blocked on legal", "went better than expected",
+         "has two open risks", "needs an owner", "could be simplified"]
+TAILS = ["before the next sprint", "if we cut scope", "according to the last report", "for the Q3 launch",
+         "once the tests pass", "after we talk to finance", "so let's track it", "which surprised me"]
+
+
+def _sentence(rng):
+    words = [rng.choice(OPENERS)]
+    if rng.random() < 0.3:
+        words.append(rng.choice(FILLERS))
+    words += [rng.choice(SUBJECTS), rng.choice(VERBS)]
+    if rng.random() < 0.6:
+        words.append(rng.choice(TAILS))
+    end = "?" if rng.random() < 0.1 else "."
+    return " ".join(words) + end
+
+
+@lru_cache(maxsize=16)
+def make_transcript(minutes, seed=7):
+    """A plausible meeting transcript of `minutes` minutes (filler words included)."""
+    rng = random.Random(f"{seed}:{minutes}")
+    target = int(minutes * WORDS_PER_MINUTE)
+    parts, count = [], 0
+    while count < target:
+        turn = " ".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+        parts.append(f"{rng.choice(SPEAKERS)}: {turn}")
+        count += len(turn.split()) + 1
+    return " ".join(parts)
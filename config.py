@@ -7,10 +7,76 @@ class Config:
     PORT = int(os.getenv("PORT", 8000))
     MONGO_URI = os.getenv("MONGO_URI")
     JWT_SECRET = os.getenv("JWT_SECRET")
+    # Verified JWTs cached per process (core/auth.py), until they expire
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+    # werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    # KDF runs on a bounded pool; beyond workers + queue, sign-ins get a 503
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 16))
+    PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", 5))
+    # Uploads are saved here by the web process and read by the Celery worker, so
+    # every web instance and worker must see the same directory (shared volume)
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "./storage/uploads")
+    # Resumable-upload spools untouched this long are deleted (swept on /upload/init)
+    UPLOAD_SPOOL_TTL = int(os.getenv("UPLOAD_SPOOL_TTL", 86400))
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # groq or gemini
     LLM_API_KEY = os.getenv("LLM_API_KEY")
     SPEECH_PROVIDER = os.getenv("SPEECH_PROVIDER", "whisper")
     SPEECH_API_KEY = os.getenv("SPEECH_API_KEY")  # <-- yahan # use karo
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Provider endpoints (overridable for local stubs, see benchmarks/)
+    ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com").rstrip("/")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1").rstrip("/")
+    # Token accounting (core/tokens.py): optional local tokenizer.json for the LLM,
+    # and the per-request prompt+completion cap (Groq free tier rate limits)
+    TOKENIZER_PATH = os.getenv("TOKENIZER_PATH")
+    LLM_MAX_REQUEST_TOKENS = int(os.getenv("LLM_MAX_REQUEST_TOKENS", 6000))
+    # LLM response cache (in-process LRU in front of Redis)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 256))
+    # Parallel LLM calls when summarizing long transcripts
+    SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+    # Rendered PDF/DOCX cache; set EXPORT_CACHE_DIR="" on read-only filesystems
+    EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "storage/exports")
+    # Processes used to render bulk ZIP exports (0 = render inline)
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+    BULK_EXPORT_MAX_NOTES = int(os.getenv("BULK_EXPORT_MAX_NOTES", 200))
+    # Render PDF/DOCX in Celery right after a note is saved. The worker writes into
+    # its own EXPORT_CACHE_DIR, so only turn this on when web and worker share
+    # that directory (same host or a mounted volume); otherwise it's wasted work.
+    PRERENDER_EXPORTS = os.getenv("PRERENDER_EXPORTS", "false").lower() == "true"
+    # ffmpeg binary for audio extraction (default: PATH, then imageio-ffmpeg)
+    FFMPEG_BIN = os.getenv("FFMPEG_BIN")
+    # Speech preprocessing before upload (core/media.preprocess_for_speech)
+    AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "true").lower() != "false"
+    SILENCE_THRESHOLD_DB = float(os.getenv("SILENCE_THRESHOLD_DB", -45))
+    SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", 0.5))
+    SILENCE_MAX_GAP = float(os.getenv("SILENCE_MAX_GAP", 1.0))
+    # Segmented transcription for long recordings
+    SEGMENTED_TRANSCRIPTION = os.getenv("SEGMENTED_TRANSCRIPTION", "true").lower() != "false"
+    SEGMENT_MAX_SECONDS = int(os.getenv("SEGMENT_MAX_SECONDS", 600))
+    SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", 4))
+    SEGMENT_RETRIES = int(os.getenv("SEGMENT_RETRIES", 2))
+    # Translation engine (core/translation.py)
+    TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", 4))
+    TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 20000))
+    # Live progress (core/progress.py): Redis snapshot lifetime and SSE stream length
+    PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", 86400))
+    # Each open stream holds a web thread, so streams are short and EventSource reconnects
+    PROGRESS_STREAM_TIMEOUT = int(os.getenv("PROGRESS_STREAM_TIMEOUT", 25))
+    # /api/search ranking (core/search.py): "mongo" text index, or in-process "memory" BM25
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "mongo").lower()
+    # memory backend: per-user indexes kept in RAM (least recently searched are dropped)
+    SEARCH_MEMORY_USERS = int(os.getenv("SEARCH_MEMORY_USERS", 64))
+    # Shared HTTP client (core/http_client.py)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+    HTTP_UPLOAD_TIMEOUT = float(os.getenv("HTTP_UPLOAD_TIMEOUT", 300))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 3))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+    # Public URL of /api/webhooks/assemblyai; when unset, status checks are polled only
+    TRANSCRIPTION_WEBHOOK_URL = os.getenv("TRANSCRIPTION_WEBHOOK_URL")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 
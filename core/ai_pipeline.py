@@ -1,15 +1,41 @@
 import os
-import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from core.meeting_url_handler import download_meeting_audio  # ✅ new import
-from core.providers import call_llm
-from core.utils import extract_audio_from_video, translate_text, optimize_for_tokens
+from core.meeting_url_handler import download_audio_from_url
+from core.providers import call_llm, GROQ_MODEL
+from core.tokens import count_tokens, chars_per_token, prompt_budget
+from core.notes_parser import parse_notes, summary_preview
+from core import http_client, progress, metrics, search
+from core.utils import split_into_chunks, hash_file
+from core.stages import (
+    run_stages, split_pieces, translate_stage, clean_stage, tee_stage, chunk_stage, summarize_stage,
+    merge_report,
+)
+from core.media import extract_audio, preprocess_for_speech, split_on_silence, to_source_time, MEDIA_EXTS
+from core.transcript_store import save_transcripts
 from config import Config
-from models.mongo_models import uploads, notes
+from models.mongo_models import uploads, notes, transcripts
 
 ASSEMBLY_HEADERS = {"authorization": Config.SPEECH_API_KEY}
+ASSEMBLY_UPLOAD_ENDPOINT = f"{Config.ASSEMBLYAI_BASE_URL}/v2/upload"
+ASSEMBLY_TRANSCRIPT_ENDPOINT = f"{Config.ASSEMBLYAI_BASE_URL}/v2/transcript"
+WEBHOOK_AUTH_HEADER = "X-Webhook-Secret"
+
+# Notes completion size; transcripts that don't fit next to it in one
+# request are summarized map-reduce style (see notes_input_budget)
+NOTES_MAX_TOKENS = 800
+SUMMARY_CHUNK_TOKENS = 2500
+SUMMARY_CHUNK_OVERLAP_TOKENS = 200
+MERGE_FAN_IN = 6
+
+# Status-check backoff (seconds)
+POLL_BASE_DELAY = 2
+POLL_MAX_DELAY = 30
+# A segment claimed for submitting/translating longer ago than this (seconds)
+# belonged to a check that died; it's released for the next check
+SEGMENT_CLAIM_TIMEOUT = 600
 
 # ✅ Safe set of supported language codes by AssemblyAI
 SUPPORTED_LANG_CODES = [
@@ -26,42 +52,71 @@ def upload_to_assemblyai(file_path: str) -> str:
 
     headers = {"authorization": Config.SPEECH_API_KEY}
     with open(file_path, "rb") as f:
-        response = requests.post(
-            "https://api.assemblyai.com/v2/upload",
+        response = http_client.post(
+            ASSEMBLY_UPLOAD_ENDPOINT,
             headers=headers,
             data=f,
-            timeout=120
+            timeout=http_client.UPLOAD_TIMEOUT,
+            idempotent=True  # a repeated upload just yields another upload_url
         )
         response.raise_for_status()
         return response.json()["upload_url"]
 
 
-def transcribe_with_assemblyai_url(audio_url: str, language: str = "auto"):
-    endpoint = "https://api.assemblyai.com/v2/transcript"
-
+def build_transcript_request(audio_url: str, language: str = "auto", webhook_url: str = None):
     # ✅ Build safe payload
     if language and language.lower() != "auto" and language.lower() in SUPPORTED_LANG_CODES:
         json_data = {"audio_url": audio_url, "language_code": language.lower()}
     else:
         json_data = {"audio_url": audio_url, "language_detection": True}
 
-    print(f"🧠 [AssemblyAI] Request: {json_data}")
+    if webhook_url:
+        json_data["webhook_url"] = webhook_url
+        if Config.WEBHOOK_SECRET:
+            json_data["webhook_auth_header_name"] = WEBHOOK_AUTH_HEADER
+            json_data["webhook_auth_header_value"] = Config.WEBHOOK_SECRET
+    return json_data
+
+
+def submit_transcription(audio_url: str, language: str = "auto", webhook_url: str = None) -> str:
+    """Queue a transcription job at AssemblyAI and return its transcript id (non-blocking)."""
+    json_data = build_transcript_request(audio_url, language, webhook_url)
+    print(f"🧠 [AssemblyAI] Request: {json_data.get('language_code') or 'language_detection'}")
 
-    r = requests.post(endpoint, headers=ASSEMBLY_HEADERS, json=json_data, timeout=60)
+    # never resent: a job accepted before a timeout would be transcribed (and billed) twice
+    r = http_client.post(ASSEMBLY_TRANSCRIPT_ENDPOINT, headers=ASSEMBLY_HEADERS, json=json_data, retries=0)
     r.raise_for_status()
-    transcript_id = r.json()["id"]
+    return r.json()["id"]
+
+
+def check_transcription(transcript_id: str) -> dict:
+    """Single status check; returns AssemblyAI's transcript payload."""
+    res = http_client.get(f"{ASSEMBLY_TRANSCRIPT_ENDPOINT}/{transcript_id}", headers=ASSEMBLY_HEADERS)
+    res.raise_for_status()
+    return res.json()
+
 
-    status_endpoint = f"{endpoint}/{transcript_id}"
+def poll_delay(attempt: int) -> float:
+    """Backoff between status checks: 2s, 3s, 4.5s ... capped at POLL_MAX_DELAY."""
+    return min(POLL_MAX_DELAY, POLL_BASE_DELAY * (1.5 ** attempt))
+
+
+def wait_for_transcription(transcript_id: str):
+    """Blocking wait used by the synchronous path. Celery uses check_transcription_task instead."""
+    attempt = 0
     while True:
-        res = requests.get(status_endpoint, headers=ASSEMBLY_HEADERS, timeout=60)
-        res.raise_for_status()
-        data = res.json()
+        data = check_transcription(transcript_id)
         if data["status"] == "completed":
             print(f"✅ [AssemblyAI] Transcription completed. Detected: {data.get('language_code')}")
             return data["text"], data.get("language_code", "auto")
         elif data["status"] == "error":
             raise RuntimeError(f"AssemblyAI error: {data['error']}")
-        time.sleep(2)
+        time.sleep(poll_delay(attempt))
+        attempt += 1
+
+
+def transcribe_with_assemblyai_url(audio_url: str, language: str = "auto"):
+    return wait_for_transcription(submit_transcription(audio_url, language))
 
 
 def transcribe_local(filepath):
@@ -72,49 +127,10 @@ def transcribe_local(filepath):
 def transcribe(file_or_url: str, language: str = None, is_url: bool = False):
     """Unified transcription handler (local file, remote URL, or pre-uploaded URL)."""
     upload_url = upload_to_assemblyai(file_or_url)
-
-    endpoint = "https://api.assemblyai.com/v2/transcript"
-    headers = {"authorization": Config.SPEECH_API_KEY}
-
-    if language and language.lower() != "auto" and language.lower() in SUPPORTED_LANG_CODES:
-        json_data = {"audio_url": upload_url, "language_code": language.lower()}
-    else:
-        json_data = {"audio_url": upload_url, "language_detection": True}
-
-    print(f"🧠 [Transcribe] Sending to AssemblyAI: {json_data}")
-
-    transcript_res = requests.post(endpoint, headers=headers, json=json_data, timeout=30)
-    transcript_res.raise_for_status()
-    transcript_id = transcript_res.json()["id"]
-
-    status_endpoint = f"{endpoint}/{transcript_id}"
-    while True:
-        poll_res = requests.get(status_endpoint, headers=headers, timeout=30)
-        poll_res.raise_for_status()
-        data = poll_res.json()
-        if data["status"] == "completed":
-            print(f"✅ [Transcribe] Completed. Language: {data.get('language_code')}")
-            return data["text"], data.get("language_code", "auto")
-        elif data["status"] == "error":
-            raise RuntimeError(f"AssemblyAI error: {data['error']}")
-        time.sleep(2)
+    return transcribe_with_assemblyai_url(upload_url, language)
 
 
-def clean_text(text):
-    """Remove filler words and extra whitespace."""
-    if not text:
-        return text
-    for w in [" um ", " uh ", " you know ", " like "]:
-        text = text.replace(w, " ")
-    return " ".join(text.split())
-
-
-def generate_notes(transcript):
-    """Generate AI-based structured meeting notes."""
-    prompt = f"""You are an advanced multilingual meeting summarizer.
-The transcript may not always be in English, but the final notes must be in **English**.
-
-Please return the meeting summary STRICTLY in valid GitHub-flavored Markdown with this structure:
+NOTES_FORMAT = """Please return the meeting summary STRICTLY in valid GitHub-flavored Markdown with this structure:
 
 ## Abstract Summary
 - 3–4 lines abstract summarizing the overall meeting.
@@ -133,100 +149,706 @@ Important formatting rules:
 - Use `-` for bullets under Key Points.
 - Use `1. 2. 3.` style for Action Items.
 - Do not include anything outside these sections.
-- Keep the style professional and concise.
+- Keep the style professional and concise."""
+
+
+def notes_input_budget():
+    """Tokens of transcript that fit in one notes request for the configured model."""
+    return prompt_budget(GROQ_MODEL, NOTES_MAX_TOKENS, count_tokens(NOTES_FORMAT) + 100)
+
+
+def summarize_chunk(index, total, chunk, usage=None):
+    """Map step: condensed English notes for one slice of a long transcript.
+    `total` is None while the transcript is still streaming in."""
+    part = f"{index + 1} of {total}" if total else f"{index + 1}"
+    prompt = f"""You are an advanced multilingual meeting summarizer.
+Below is part {part} of a long meeting transcript (parts overlap slightly).
+Write concise English notes for THIS part only, as `-` bullets grouped under:
+Topics & Key Points, Decisions, Action Items (Who – What – By When), Tone.
+Do not invent details that are not in the text.
+
+Transcript part {part}:
+{chunk}
+"""
+    return call_llm(prompt, max_tokens=NOTES_MAX_TOKENS, usage=usage)
+
+
+def merge_summaries(partials, usage=None):
+    """Reduce step: fold partial notes into the final notes format.
+    Very long meetings are reduced in rounds so each prompt stays bounded."""
+    while len(partials) > 1 and count_tokens("\n\n".join(partials)) > notes_input_budget():
+        groups = [partials[i:i + MERGE_FAN_IN] for i in range(0, len(partials), MERGE_FAN_IN)]
+        partials = run_parallel(
+            lambda group: summarize_chunk(0, 1, "\n\n".join(group), usage), groups
+        )
+
+    joined = "\n\n".join(f"### Part {i + 1}\n{p}" for i, p in enumerate(partials))
+    prompt = f"""You are an advanced multilingual meeting summarizer.
+Below are notes taken on consecutive parts of ONE meeting. Merge them into a single
+set of meeting notes in **English**, removing duplicates from overlapping parts.
+
+{NOTES_FORMAT}
+
+Partial notes:
+{joined}
+"""
+    return call_llm(prompt, max_tokens=NOTES_MAX_TOKENS, usage=usage)
+
+
+def run_parallel(fn, items, concurrency=None):
+    """Map fn over items on a bounded thread pool, keeping order."""
+    if not items:
+        return []
+    workers = max(1, min(concurrency or Config.SUMMARY_CONCURRENCY, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+def generate_notes(transcript, usage=None):
+    """Generate AI-based structured meeting notes.
+    Long transcripts are summarized chunk-by-chunk in parallel, then merged.
+    Provider token usage is added to `usage` when given."""
+    if count_tokens(transcript) > notes_input_budget():
+        # size chunks in tokens, converted with this text's own chars/token ratio
+        ratio = chars_per_token(transcript)
+        chunks = split_into_chunks(
+            transcript, int(SUMMARY_CHUNK_TOKENS * ratio), int(SUMMARY_CHUNK_OVERLAP_TOKENS * ratio)
+        )
+        print(f"🧩 [Summarize] Long transcript: {len(chunks)} chunks, "
+              f"{min(Config.SUMMARY_CONCURRENCY, len(chunks))} in parallel")
+        if usage is not None:
+            usage["chunks"] = len(chunks)
+        partials = run_parallel(
+            lambda item: summarize_chunk(item[0], len(chunks), item[1], usage), list(enumerate(chunks))
+        )
+        return merge_summaries(partials, usage)
+
+    prompt = f"""You are an advanced multilingual meeting summarizer.
+The transcript may not always be in English, but the final notes must be in **English**.
+
+{NOTES_FORMAT}
 
 Transcript extract:
 {transcript}
 """
-    return call_llm(prompt)
+    return call_llm(prompt, max_tokens=NOTES_MAX_TOKENS, usage=usage)
+
+
+def summarize_stream(pieces, usage=None):
+    """
+    Notes for a stream of cleaned transcript pieces. Pieces are buffered
+    until they no longer fit in one request; from then on each chunk is
+    summarized as soon as its text is final, while upstream stages are
+    still producing the pieces after it.
+    """
+    pieces = iter(pieces)
+    seen, tokens, budget = [], 0, notes_input_budget()
+    for piece in pieces:
+        seen.append(piece)
+        tokens += count_tokens(piece)
+        if tokens > budget:
+            break
+    else:
+        return generate_notes(" ".join(seen), usage=usage)
+
+    # size chunks with the chars/token ratio of what has arrived so far
+    ratio = chars_per_token(" ".join(seen))
+
+    def replay():
+        yield from seen
+        yield from pieces
+
+    with ThreadPoolExecutor(max_workers=max(1, Config.SUMMARY_CONCURRENCY)) as pool:
+        futures = list(run_stages(
+            replay(),
+            chunk_stage(int(SUMMARY_CHUNK_TOKENS * ratio), int(SUMMARY_CHUNK_OVERLAP_TOKENS * ratio)),
+            summarize_stage(pool, lambda index, chunk: summarize_chunk(index, None, chunk, usage)),
+        ))
+        print(f"🧩 [Summarize] Long transcript: {len(futures)} chunks, "
+              f"{min(Config.SUMMARY_CONCURRENCY, len(futures))} in parallel")
+        partials = [f.result() for f in futures]
+    if usage is not None:
+        usage["chunks"] = len(partials)
+    return merge_summaries(partials, usage)
 
 
 def set_progress(upload_id, stage, percent):
-    """Helper to update progress safely."""
+    """
+    Publish progress to Redis (status polls and the SSE stream read it there).
+    Mongo is only written on stage transitions, or always if Redis is down.
+    """
+    if progress.publish(upload_id, status=stage, stage=stage, percent=percent) is False:
+        return
     try:
         uploads.update_one(
             {"_id": upload_id},
             {"$set": {
                 "status": stage,
-                "progress": {"stage": stage, "percent": percent}
+                "progress.stage": stage,
+                "progress.percent": percent
             }}
         )
     except Exception:
         pass
 
 
-def process_upload(upload_id, file_path_or_url, user_id, language="auto", is_url=False):
-    """Main processing pipeline for uploads."""
+def get_audio_hash(upload_id, file_path):
+    """sha256 recorded at upload time (single-request uploads), or computed here
+    in the worker for chunked uploads and local files that skipped the upload routes."""
     try:
-        # 🆕 Handle Meeting URLs first
-        if is_url:
-            set_progress(upload_id, "downloading", 5)
-            print(f"🧠 [Meeting URL] Downloading audio from: {file_path_or_url}")
-            file_path_or_url = download_meeting_audio(file_path_or_url)
-            is_url = False  # ab ye local file ban gaya
-            set_progress(upload_id, "downloaded", 10)
-            print(f"✅ [Meeting URL] Audio downloaded: {file_path_or_url}")
-
-        set_progress(upload_id, "processing", 15)
-
-        # 1️⃣ Extract audio if video
-        if not is_url and file_path_or_url.lower().endswith(".mp4"):
-            set_progress(upload_id, "extracting", 20)
-            audio_path = file_path_or_url.rsplit(".", 1)[0] + "_2min.mp3"
-            file_path_or_url = extract_audio_from_video(file_path_or_url, audio_path, duration=120)
-            set_progress(upload_id, "extracted", 30)
-
-        # 2️⃣ Transcribe
-        set_progress(upload_id, "transcribing", 40)
-        transcript, detected_lang = transcribe(file_path_or_url, is_url=is_url, language=language)
-        set_progress(upload_id, "transcribed", 55)
+        u = uploads.find_one({"_id": upload_id}, {"audio_sha256": 1})
+        if u and u.get("audio_sha256"):
+            return u["audio_sha256"]
+        if file_path and os.path.exists(file_path):
+            digest = hash_file(file_path)
+            uploads.update_one({"_id": upload_id}, {"$set": {"audio_sha256": digest}})
+            return digest
+    except Exception as e:
+        print(f"⚠️ [Transcript Cache] Could not hash audio: {e}")
+    return None
+
+
+def get_cached_transcript(audio_hash, language, extract_duration=0):
+    """Return (text, detected_lang) for audio we've already transcribed, else None."""
+    if not audio_hash:
+        return None
+    try:
+        t = transcripts.find_one({
+            "audio_sha256": audio_hash,
+            "language": (language or "auto").lower(),
+            "extract_duration": extract_duration or 0
+        })
+    except Exception as e:
+        print(f"⚠️ [Transcript Cache] Lookup failed: {e}")
+        return None
+    if not t:
+        return None
+    return t["text"], t.get("detected_language", "auto")
+
 
-        # 3️⃣ Translate if not English
+def store_cached_transcript(audio_hash, language, extract_duration, text, detected_lang, words=None):
+    if not audio_hash:
+        return
+    try:
+        transcripts.update_one(
+            {
+                "audio_sha256": audio_hash,
+                "language": (language or "auto").lower(),
+                "extract_duration": extract_duration or 0
+            },
+            {"$set": {
+                "text": text,
+                "detected_language": detected_lang,
+                "words": words or [],
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"⚠️ [Transcript Cache] Store failed: {e}")
+
+
+def preprocess_audio(upload_id, audio_path):
+    """Speech-optimized copy of the audio; records size/time mapping on the upload.
+    Returns (path, silences) where silences is (silences, duration) in processed
+    time for split_for_transcription, or None when preprocessing fell back to
+    the original audio."""
+    try:
+        processed, report, silences = preprocess_for_speech(audio_path)
+    except Exception as e:
+        print(f"⚠️ [Preprocess] Skipped for {upload_id}: {e}")
+        return audio_path, None
+    print(f"🗜️ [Preprocess] {report['original_bytes']} → {report['processed_bytes']} bytes "
+          f"(x{report['size_ratio']})")
+    uploads.update_one({"_id": upload_id}, {"$set": {"preprocess": report}})
+    return processed, (silences, report["processed_duration"])
+
+
+class UploadFailed(RuntimeError):
+    """The upload has already been marked failed (and the failure published)."""
+
+
+def fail_upload(upload_id, error):
+    print(f"❌ [Process Upload] Failed for {upload_id}: {error}")
+    uploads.update_one(
+        {"_id": upload_id},
+        {"$set": {"status": "failed", "error": str(error)}}
+    )
+    progress.publish(upload_id, status="failed", error=str(error))
+
+
+def start_upload(upload_id, file_path_or_url, user_id, language="auto", is_url=False,
+                 extract_duration=0, webhook_url=None):
+    """
+    Pipeline stages up to (and including) submitting the transcription job.
+    Returns {"transcript": (text, lang)} on a cache hit, otherwise
+    {"segments": n} for a job that still has to be checked.
+    Meeting URLs (is_url) are downloaded here, in the worker, and the
+    download is removed once it's been handed on.
+    """
+    if not is_url:
+        return start_local_upload(upload_id, file_path_or_url, language, extract_duration, webhook_url)
+
+    # 🆕 Handle Meeting URLs first
+    set_progress(upload_id, "downloading", 5)
+    print(f"🧠 [Meeting URL] Downloading audio from: {file_path_or_url}")
+    with metrics.timer("stage_seconds", stage="download"):
+        local_path = download_audio_from_url(file_path_or_url)
+    set_progress(upload_id, "downloaded", 10)
+    print(f"✅ [Meeting URL] Audio downloaded: {local_path}")
+    try:
+        return start_local_upload(upload_id, local_path, language, extract_duration, webhook_url)
+    finally:
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+
+def start_local_upload(upload_id, file_path, language="auto", extract_duration=0, webhook_url=None):
+    """start_upload for a recording already on local disk (the caller owns `file_path`)."""
+    if not os.path.exists(file_path):
+        # the web process saved it; UPLOAD_FOLDER has to be a volume both services mount
+        raise FileNotFoundError(
+            f"Upload file not on this host: {file_path} (UPLOAD_FOLDER must be shared by web and worker)"
+        )
+    set_progress(upload_id, "processing", 15)
+
+    # 🔁 Identical audio already transcribed? Skip extraction + transcription.
+    audio_hash = get_audio_hash(upload_id, file_path)
+    cached = get_cached_transcript(audio_hash, language, extract_duration)
+    if cached:
+        print(f"♻️ [Transcript Cache] Hit for {audio_hash[:12]}")
+        set_progress(upload_id, "transcribed", 55)
+        return {"transcript": cached}
+
+    # 1️⃣ Extract audio from video / cut to the requested duration
+    audio_path = file_path
+    if file_path.rsplit(".", 1)[-1].lower() in MEDIA_EXTS:
+        set_progress(upload_id, "extracting", 20)
+        with metrics.timer("stage_seconds", stage="extract"):
+            audio_path = extract_audio(file_path, duration=extract_duration or None)
+        set_progress(upload_id, "extracted", 30)
+    temp_files = [audio_path] if audio_path != file_path else []
+
+    # 1️⃣➕ Shrink for upload: mono 16 kHz, silence trimmed, Opus
+    silences = None
+    if Config.AUDIO_PREPROCESS:
+        set_progress(upload_id, "preprocessing", 35)
+        with metrics.timer("stage_seconds", stage="preprocess"):
+            audio_path, silences = preprocess_audio(upload_id, audio_path)
+        temp_files.append(audio_path)
+
+    # 2️⃣ Split long recordings at silences, upload, submit (no waiting here)
+    set_progress(upload_id, "transcribing", 40)
+    try:
+        pieces = split_for_transcription(upload_id, audio_path, silences)
+        temp_files += [path for _, path in pieces]
+        with metrics.timer("stage_seconds", stage="upload"):
+            segments = upload_segments(pieces)
+    finally:
+        for path in set(temp_files) - {file_path}:
+            if os.path.exists(path):
+                os.remove(path)
+
+    submit_ready_segments(segments, language, webhook_url)
+    uploads.update_one(
+        {"_id": upload_id},
+        {"$set": {
+            "language": language,
+            "extract_duration": extract_duration,
+            "transcription": {
+                "state": "submitted",
+                "rev": 0,
+                "language": language,
+                "webhook_url": webhook_url,
+                "segments": segments,
+                "submitted_at": datetime.utcnow()
+            }
+        }}
+    )
+    print(f"📨 [AssemblyAI] Submitted upload {upload_id} as {len(segments)} segment(s)")
+    return {"segments": len(segments)}
+
+
+def split_for_transcription(upload_id, audio_path, silences=None):
+    """
+    Segment long local recordings at silences; one piece otherwise.
+    `silences` is (silences, duration) from preprocessing, if it ran.
+    """
+    if not Config.SEGMENTED_TRANSCRIPTION or not os.path.exists(audio_path):
+        return [(0.0, audio_path)]
+    try:
+        pieces = split_on_silence(audio_path, Config.SEGMENT_MAX_SECONDS, *(silences or ()))
+    except Exception as e:
+        print(f"⚠️ [Segments] Could not split {upload_id}, sending as one file: {e}")
+        return [(0.0, audio_path)]
+    if len(pieces) > 1:
+        print(f"✂️ [Segments] {upload_id}: {len(pieces)} segments of ≤{Config.SEGMENT_MAX_SECONDS}s")
+    return pieces
+
+
+def upload_segments(pieces):
+    """Upload segment files (bounded concurrency) → segment state dicts."""
+    urls = run_parallel(lambda piece: upload_to_assemblyai(piece[1]), pieces, Config.SEGMENT_CONCURRENCY)
+    return [
+        {"index": i, "offset": offset, "upload_url": url, "id": None, "status": "pending", "attempts": 0}
+        for i, ((offset, _), url) in enumerate(zip(pieces, urls))
+    ]
+
+
+def claim_ready_segments(segments):
+    """Mark pending segments 'submitting' while fewer than SEGMENT_CONCURRENCY
+    are in flight; returns them. The claim is saved before anything is sent."""
+    in_flight = sum(1 for seg in segments if seg["status"] in ("submitted", "submitting"))
+    claimed = []
+    for seg in segments:
+        if in_flight >= Config.SEGMENT_CONCURRENCY:
+            break
+        if seg["status"] == "pending":
+            seg["status"], seg["claimed_at"] = "submitting", time.time()
+            claimed.append(seg)
+            in_flight += 1
+    return claimed
+
+
+def submit_claimed_segments(claimed, language, webhook_url=None):
+    """Submit claimed segments. One that couldn't be sent goes back to 'pending'."""
+    try:
+        for seg in claimed:
+            seg["id"] = submit_transcription(seg["upload_url"], language, webhook_url=webhook_url)
+            seg["status"] = "submitted"
+            seg["attempts"] += 1
+    finally:
+        for seg in claimed:
+            seg.pop("claimed_at", None)
+            if seg["status"] == "submitting":
+                seg["status"] = "pending"
+
+
+def submit_ready_segments(segments, language, webhook_url=None):
+    """Submit pending segments while fewer than SEGMENT_CONCURRENCY are in flight."""
+    submit_claimed_segments(claim_ready_segments(segments), language, webhook_url)
+
+
+def release_stale_claims(segments):
+    """Claims left behind by a worker that died mid-step go back to the pool.
+    (A submit that did reach AssemblyAI before the crash is sent again.)"""
+    cutoff = time.time() - SEGMENT_CLAIM_TIMEOUT
+    for seg in segments:
+        if seg["status"] == "submitting" and seg["claimed_at"] < cutoff:
+            seg["status"], seg["id"] = "pending", None
+            seg.pop("claimed_at")
+        if seg.get("preparing", cutoff) < cutoff:
+            seg.pop("preparing")
+
+
+def refresh_segments(segments):
+    """Check every in-flight segment once. A failed segment goes back to
+    'pending' (resubmitted on its own) until SEGMENT_RETRIES is used up."""
+    in_flight = [seg for seg in segments if seg["status"] == "submitted"]
+    results = run_parallel(lambda seg: check_transcription(seg["id"]), in_flight, Config.SEGMENT_CONCURRENCY)
+    for seg, data in zip(in_flight, results):
+        if data["status"] == "completed":
+            seg["status"] = "completed"
+            seg["text"] = data.get("text") or ""
+            seg["language_code"] = data.get("language_code", "auto")
+            seg["words"] = [[w["start"], w["end"], w["text"]] for w in data.get("words") or []]
+        elif data["status"] == "error":
+            if seg["attempts"] > Config.SEGMENT_RETRIES:
+                raise RuntimeError(f"AssemblyAI error on segment {seg['index']}: {data.get('error')}")
+            print(f"🔁 [Segments] Segment {seg['index']} failed ({data.get('error')}), retrying")
+            seg["status"] = "pending"
+            seg["id"] = None
+
+
+def claim_prepare_segments(segments):
+    """Completed segments nobody has translated/cleaned (or started to) yet."""
+    claimed = [seg for seg in segments
+               if seg["status"] == "completed" and "clean" not in seg and "preparing" not in seg]
+    for seg in claimed:
+        seg["preparing"] = time.time()
+    return claimed
+
+
+def prepare_segments(ready):
+    """
+    Translate and clean segments that completed since the last check, so
+    that work overlaps with the segments still being transcribed. This
+    batch's translation report is kept on its first segment (all of them
+    are merged when the upload finishes).
+    """
+    if not ready:
+        return
+    report, translated = {}, []
+    cleaned = list(run_stages(
+        ((seg.get("text") or "", seg.get("language_code")) for seg in ready),
+        translate_stage("en", report), tee_stage(translated), clean_stage,
+    ))
+    for seg, text, clean in zip(ready, translated, cleaned):
+        seg["translated"], seg["clean"], seg["translation"] = text, clean, {}
+    ready[0]["translation"] = report
+
+
+def save_segments(upload_id, segments, fields):
+    """
+    Write `fields` of the given segments in place (by index) and bump the
+    revision, so a check still holding an older copy of the list can't
+    overwrite them with its whole-list write.
+    """
+    update = {"$set": {}, "$unset": {}, "$inc": {"transcription.rev": 1}}
+    for seg in segments:
+        for field in fields:
+            key = f"transcription.segments.{seg['index']}.{field}"
+            if field in seg:
+                update["$set"][key] = seg[field]
+            else:
+                update["$unset"][key] = ""
+    uploads.update_one(
+        {"_id": upload_id, "transcription.state": "submitted"},
+        {op: value for op, value in update.items() if value}
+    )
+
+
+def stitch_segments(segments, time_map=None):
+    """
+    Join segment transcripts in order. Word timestamps (ms) are shifted by
+    each segment's offset, then mapped back through the preprocessing time
+    map to positions in the original recording.
+    """
+    ordered = sorted(segments, key=lambda seg: seg["index"])
+    text = " ".join(seg["text"].strip() for seg in ordered if seg.get("text"))
+
+    langs = [seg.get("language_code") for seg in ordered if seg.get("text")]
+    detected_lang = max(set(langs), key=langs.count) if langs else "auto"
+
+    words = []
+    for seg in ordered:
+        offset_ms = seg["offset"] * 1000
+        for start, end, word in seg.get("words") or []:
+            words.append([
+                round(to_source_time((start + offset_ms) / 1000, time_map) * 1000),
+                round(to_source_time((end + offset_ms) / 1000, time_map) * 1000),
+                word,
+            ])
+    return text, detected_lang, words
+
+
+def complete_transcription(upload_id, transcript, detected_lang, words=None):
+    """Store the finished transcript in the cache and drop bulky per-segment data."""
+    u = uploads.find_one({"_id": upload_id}, {"audio_sha256": 1, "language": 1, "extract_duration": 1})
+    store_cached_transcript(
+        u.get("audio_sha256"), u.get("language"), u.get("extract_duration", 0),
+        transcript, detected_lang, words
+    )
+    uploads.update_one(
+        {"_id": upload_id},
+        {"$set": {"transcription.completed_at": datetime.utcnow()},
+         "$unset": {
+             "transcription.segments.$[].text": "",
+             "transcription.segments.$[].words": "",
+             "transcription.segments.$[].translated": "",
+             "transcription.segments.$[].clean": "",
+             "transcription.segments.$[].translation": "",
+         }}
+    )
+    set_progress(upload_id, "transcribed", 55)
+    return transcript, detected_lang
+
+
+def advance_transcription(upload_id):
+    """
+    One non-blocking step of the transcription state machine: check in-flight
+    segments, resubmit failed ones, submit queued ones, and finish the upload
+    once every segment is done.
+
+    A webhook-triggered check and a poll can run at once. The whole-list write
+    is guarded by a revision number, and segments to submit (or translate) are
+    claimed in that write: only the check that wins it sends them to
+    AssemblyAI, then saves the results per segment. So a segment is never
+    submitted (billed) twice and no translation is thrown away on a conflict.
+    Returns {"state": "pending" | "failed" | "skipped" | "done", ...}.
+    """
+    u = uploads.find_one(
+        {"_id": upload_id}, {"user_id": 1, "transcription": 1, "preprocess.time_map": 1}
+    )
+    job = (u or {}).get("transcription") or {}
+    if job.get("state") != "submitted":
+        return {"state": "skipped"}
+
+    segments = job["segments"]
+    try:
+        refresh_segments(segments)
+    except RuntimeError as e:
+        fail_upload(upload_id, e)
+        uploads.update_one({"_id": upload_id}, {"$set": {"transcription.state": "error"}})
+        return {"state": "failed", "error": str(e)}
+    release_stale_claims(segments)
+    to_submit = claim_ready_segments(segments)
+    to_prepare = claim_prepare_segments(segments)
+
+    res = uploads.update_one(
+        {"_id": upload_id, "transcription.state": "submitted", "transcription.rev": job.get("rev", 0)},
+        {"$set": {"transcription.segments": segments, "transcription.rev": job.get("rev", 0) + 1}}
+    )
+    if not res.modified_count:
+        # another check wrote first; keep polling, it will see the newer state
+        return {"state": "pending", "conflict": True}
+
+    # the claimed segments are this check's alone now
+    try:
+        submit_claimed_segments(to_submit, job.get("language"), job.get("webhook_url"))
+    finally:
+        save_segments(upload_id, to_submit, ("id", "status", "attempts", "claimed_at"))
+    # downstream stages start on finished segments while the rest transcribe
+    try:
+        prepare_segments(to_prepare)
+    finally:
+        for seg in to_prepare:
+            seg.pop("preparing", None)
+        save_segments(upload_id, to_prepare, ("translated", "clean", "translation", "preparing"))
+
+    done = sum(1 for seg in segments if seg["status"] == "completed")
+    if done == len(segments):
+        # other checks may have prepared some segments: finish from the stored list
+        segments = uploads.find_one({"_id": upload_id}, {"transcription.segments": 1})["transcription"]["segments"]
+        done = sum(1 for seg in segments if seg["status"] == "completed" and "clean" in seg)
+    if done < len(segments):
+        set_progress(upload_id, "transcribing", 40 + int(15 * done / len(segments)))
+        return {"state": "pending", "completed": done, "total": len(segments)}
+
+    res = uploads.update_one(
+        {"_id": upload_id, "transcription.state": "submitted"},
+        {"$set": {"transcription.state": "completed"}, "$inc": {"transcription.rev": 1}}
+    )
+    if not res.modified_count:
+        return {"state": "pending", "conflict": True}
+
+    # the state is "completed" now, so no later check will pick this upload up
+    # again: anything that goes wrong from here has to fail it explicitly
+    try:
+        time_map = (u.get("preprocess") or {}).get("time_map")
+        transcript, detected_lang, words = stitch_segments(segments, time_map)
+        complete_transcription(upload_id, transcript, detected_lang, words)
+        if job.get("submitted_at"):
+            waited = (datetime.utcnow() - job["submitted_at"]).total_seconds()
+            metrics.observe("stage_seconds", waited, stage="transcribe_wait")
+        ordered = [seg for seg in sorted(segments, key=lambda seg: seg["index"]) if seg.get("text")]
+        report = {}
+        for seg in segments:
+            if seg.get("translation"):
+                merge_report(report, seg["translation"])
+        prepared = {
+            "translated": [seg["translated"] for seg in ordered],
+            "cleaned": [seg["clean"] for seg in ordered],
+            "translation": report,
+        }
+        result = finish_upload(upload_id, u["user_id"], transcript, detected_lang, prepared=prepared)
+    except Exception as e:
+        fail_upload(upload_id, e)
+        return {"state": "failed", "error": str(e)}
+    return {"state": "done", **result}
+
+
+def finish_upload(upload_id, user_id, transcript, detected_lang, prepared=None):
+    """
+    Pipeline stages after transcription: translate → clean → chunk → summarize,
+    streamed piece by piece (core/stages.py) so chunk summaries run while later
+    pieces are still being translated, then save.
+    `prepared` carries segments already translated and cleaned during transcription.
+    """
+    if prepared:
+        report = prepared.get("translation") or {}
+        translated_parts, cleaned_parts = prepared["translated"], prepared["cleaned"]
+        stream = iter(cleaned_parts)
+    else:
+        report, translated_parts, cleaned_parts = {}, [], []
         if detected_lang and detected_lang.lower() != "en":
             set_progress(upload_id, "translating", 65)
-            translated = translate_text(transcript, src=detected_lang, target="en")
-            set_progress(upload_id, "translated", 75)
-        else:
-            translated = transcript
-
-        # 4️⃣ Clean + optimize
-        cleaned = clean_text(translated)
-        cleaned = optimize_for_tokens(cleaned, max_tokens=3000)
-        set_progress(upload_id, "optimized", 85)
-
-        # 5️⃣ Generate notes
-        set_progress(upload_id, "summarizing", 90)
-        notes_text = generate_notes(cleaned)
-        set_progress(upload_id, "summarized", 95)
-
-        # 6️⃣ Save result to DB
-        note_doc = {
-            "user_id": str(user_id),
-            "upload_id": upload_id,
-            "raw_transcript": transcript,
-            "translated_transcript": translated if translated != transcript else None,
-            "cleaned_transcript": cleaned,
-            "final_notes": notes_text,
-            "detected_language": detected_lang,
-            "created_at": datetime.utcnow()
-        }
+        stream = run_stages(
+            ((piece, detected_lang) for piece in split_pieces(transcript)),
+            translate_stage("en", report), tee_stage(translated_parts),
+            clean_stage, tee_stage(cleaned_parts),
+        )
+
+    # 3️⃣-5️⃣ Translate, clean and summarize as one stream
+    # (long transcripts are chunked, not truncated)
+    set_progress(upload_id, "summarizing", 75)
+    usage = {}
+    with metrics.timer("stage_seconds", stage="summarize"):
+        notes_text = summarize_stream(stream, usage=usage)
+    translated = " ".join(translated_parts)
+    cleaned = " ".join(cleaned_parts)
+
+    was_translated = bool(report.get("total_batches") or report.get("cached_sentences"))
+    if was_translated:
+        uploads.update_one({"_id": upload_id}, {"$set": {"translation": report}})
+        if not report["complete"]:
+            print(f"⚠️ [Translate] {upload_id}: {report['failed_batches']}/{report['total_batches']} "
+                  f"batches left untranslated")
+    tokens = {"transcript": count_tokens(cleaned), "budget": notes_input_budget(), **usage}
+    set_progress(upload_id, "summarized", 95)
+
+    # 6️⃣ Save result to DB
+    note_doc = {
+        "user_id": str(user_id),
+        "upload_id": upload_id,
+        "final_notes": notes_text,
+        "notes_tree": parse_notes(notes_text),
+        "summary_preview": summary_preview(notes_text),
+        "detected_language": detected_lang,
+        "created_at": datetime.utcnow()
+    }
+    with metrics.timer("stage_seconds", stage="db_write"):
         res = notes.insert_one(note_doc)
+        # transcripts go out of line, compressed (cleaned one is derived on read)
+        save_transcripts(res.inserted_id, transcript, translated if was_translated else None)
+        try:
+            search.index_note(res.inserted_id, user_id, notes_text, cleaned, note_doc["created_at"])
+        except Exception as e:
+            print(f"⚠️ [search] Could not index note {res.inserted_id}: {e}")
 
         uploads.update_one(
             {"_id": upload_id},
             {"$set": {
                 "status": "done",
                 "note_id": str(res.inserted_id),
-                "progress": {"stage": "done", "percent": 100}
+                "progress.stage": "done",
+                "progress.percent": 100,
+                "progress.tokens": tokens
             }}
         )
 
-        return {"note_id": str(res.inserted_id)}
+    progress.publish(
+        upload_id, status="done", stage="done", percent=100, note_id=str(res.inserted_id), tokens=tokens
+    )
 
-    except Exception as e:
-        print(f"❌ [Process Upload] Failed for {upload_id}: {str(e)}")
-        uploads.update_one(
-            {"_id": upload_id},
-            {"$set": {"status": "failed", "error": str(e)}}
+    return {"note_id": str(res.inserted_id)}
+
+
+def process_upload(upload_id, file_path_or_url, user_id, language="auto", is_url=False, extract_duration=0):
+    """Main processing pipeline for uploads (synchronous: waits for the transcript)."""
+    try:
+        state = start_upload(
+            upload_id, file_path_or_url, user_id, language=language,
+            is_url=is_url, extract_duration=extract_duration
         )
+        if "transcript" in state:
+            return finish_upload(upload_id, user_id, *state["transcript"])
+
+        attempt = 0
+        while True:
+            time.sleep(poll_delay(attempt))
+            step = advance_transcription(upload_id)
+            if step["state"] == "done":
+                return {"note_id": step["note_id"]}
+            if step["state"] == "failed":
+                # advance_transcription already called fail_upload
+                raise UploadFailed(step.get("error"))
+            if step["state"] == "skipped":
+                raise RuntimeError("Transcription was already completed by another worker")
+            attempt += 1
+
+    except UploadFailed:
+        raise
+    except Exception as e:
+        fail_upload(upload_id, e)
         raise
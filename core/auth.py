@@ -0,0 +1,137 @@
+"""
+Shared auth for every blueprint.
+
+- load_user() runs before each request (app.before_request) and sets
+  g.user_id from the Bearer token, or DEMO_USER. Verified tokens are kept in
+  a bounded LRU keyed by the token's SHA-256 until they expire, so the JWT
+  isn't re-verified on every request.
+- hash_password / check_password run the (deliberately slow) KDF on a small
+  bounded pool, so a burst of logins can't take every web thread. When the
+  pool and its queue are full, PasswordHashBusy is raised (→ 503).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g, request
+from jose import jwt, JWTError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import Config
+from core import metrics
+
+DEMO_USER = "demo_user"
+
+_lock = threading.Lock()
+_tokens = OrderedDict()   # sha256(token) -> (user_id, expires_at)
+_pool = None
+_pool_pid = None
+_slots = None
+
+
+class PasswordHashBusy(RuntimeError):
+    """Too many password hashes queued; the client should retry shortly."""
+
+
+# ------------------ TOKENS ------------------
+def verify_token(token):
+    """user_id for a valid token, else None. Cached until the token's exp."""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+    with _lock:
+        cached = _tokens.get(key)
+        if cached and cached[1] > now:
+            _tokens.move_to_end(key)
+        elif cached:
+            del _tokens[key]
+            cached = None
+    metrics.inc("auth_token_cache_total", result="hit" if cached else "miss")
+    if cached:
+        return cached[0]
+
+    try:
+        payload = jwt.decode(token, Config.JWT_SECRET, algorithms=["HS256"])
+    except JWTError:
+        # Invalid / expired token
+        return None
+    user_id = str(payload.get("sub") or "")
+    if not user_id:
+        return None
+
+    # tokens without exp are still cached, but only for a day
+    expires_at = min(float(payload.get("exp") or now + 86400), now + 86400)
+    with _lock:
+        _tokens[key] = (user_id, expires_at)
+        while len(_tokens) > Config.AUTH_TOKEN_CACHE_SIZE:
+            _tokens.popitem(last=False)
+    return user_id
+
+
+def user_from_request():
+    auth = request.headers.get("Authorization", "")
+    parts = auth.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return DEMO_USER
+    try:
+        return verify_token(parts[1]) or DEMO_USER
+    except Exception as e:
+        print("⚠️ [auth] Error decoding token:", e)
+        return DEMO_USER
+
+
+def load_user():
+    """before_request hook: g.user_id for the route handlers."""
+    g.user_id = user_from_request()
+
+
+def get_user_from_auth():
+    """
+    user_id of the current request (set by load_user).
+    Falls back to 'demo_user' if token is invalid or missing.
+    """
+    if "user_id" not in g:
+        load_user()
+    return g.user_id
+
+
+# ------------------ PASSWORDS ------------------
+def get_hash_pool():
+    """Bounded pool for KDF work, rebuilt after fork (gunicorn workers)."""
+    global _pool, _pool_pid, _slots
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+            _slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE)
+            _pool_pid = os.getpid()
+        return _pool, _slots
+
+
+def run_hash(op, fn, *args):
+    pool, slots = get_hash_pool()
+    if not slots.acquire(timeout=Config.PASSWORD_HASH_WAIT):
+        metrics.inc("password_hash_rejected_total", op=op)
+        raise PasswordHashBusy("Too many sign-ins right now, try again shortly")
+
+    def timed():
+        # KDF time only; time spent queued for a worker isn't counted
+        with metrics.timer("password_hash_seconds", op=op):
+            return fn(*args)
+
+    try:
+        return pool.submit(timed).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    """Hash with Config.PASSWORD_HASH_METHOD (werkzeug method string, sets the cost)."""
+    return run_hash("hash", generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def check_password(pwhash, password):
+    return run_hash("check", check_password_hash, pwhash, password)
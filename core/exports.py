@@ -0,0 +1,191 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from config import Config
+from core import metrics
+from core.utils import export_to_pdf, export_to_docx
+from core.notes_parser import parse_notes
+
+FORMATS = {
+    "pdf": {
+        "render": export_to_pdf,
+        "mimetype": "application/pdf",
+    },
+    "docx": {
+        "render": export_to_docx,
+        "mimetype": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    },
+}
+
+
+def content_hash(notes_text):
+    """Short digest of the note body; the artifact (and its ETag) changes only when this does."""
+    return hashlib.sha256((notes_text or "").encode("utf-8")).hexdigest()[:20]
+
+
+def export_etag(notes_text, fmt):
+    return f"{content_hash(notes_text)}-{fmt}"
+
+
+def render_export(notes, fmt):
+    """Render a note (stored tree or raw text) straight into memory; no files involved."""
+    with metrics.timer("export_render_seconds", format=fmt):
+        return FORMATS[fmt]["render"](notes or "")
+
+
+def render_timed(notes, fmt):
+    """Pool-side render: (bytes, seconds), so the parent process records the timing."""
+    started = time.perf_counter()
+    data = FORMATS[fmt]["render"](notes or "")
+    return data, time.perf_counter() - started
+
+
+def artifact_path(note_id, fmt, digest):
+    return os.path.join(Config.EXPORT_CACHE_DIR, f"{note_id}.{digest}.{fmt}")
+
+
+def read_artifact(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_artifact(path, data):
+    """Atomic write (temp file + rename) so readers never see a partial file.
+    Failures (read-only / full disk) are logged and ignored."""
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ [Export Cache] Could not store {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_export(note_id, notes_text, fmt, tree=None):
+    """
+    Export bytes for this note + content. Served from the artifact cache
+    (Config.EXPORT_CACHE_DIR) when enabled, otherwise rendered in memory
+    from the note's stored tree (parsed from the text for older notes).
+    """
+    if not Config.EXPORT_CACHE_DIR:
+        return render_export(tree or notes_text, fmt)
+
+    path = artifact_path(note_id, fmt, content_hash(notes_text))
+    data = read_artifact(path)
+    if data is None:
+        data = render_export(tree or notes_text, fmt)
+        write_artifact(path, data)
+    return data
+
+
+def prerender_all(note_id, notes_text, tree=None):
+    """Render every format into the artifact cache ahead of the first download (Celery).
+    Only useful when the web tier reads the same EXPORT_CACHE_DIR (PRERENDER_EXPORTS)."""
+    if not Config.EXPORT_CACHE_DIR:
+        return
+    tree = tree or parse_notes(notes_text)
+    for fmt in FORMATS:
+        get_export(note_id, notes_text, fmt, tree)
+
+
+# --- Bulk export: ZIP streamed while documents render on a process pool ---
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def get_render_pool():
+    """Process pool for CPU-bound rendering (ReportLab holds the GIL); None = render inline."""
+    global _pool
+    if Config.EXPORT_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the web worker may have threads, and fork + threads can deadlock
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+class ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer; zipfile then streams with data descriptors."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_exports(items, fmt):
+    """
+    Yield (name, bytes) for items of (name, note_id, notes_text, tree) as each one
+    is ready: cache hits first, misses as soon as their render finishes.
+    At most 2x the pool size renders are in flight, so memory stays flat.
+    """
+    pool = get_render_pool()
+    window = max(1, 2 * Config.EXPORT_WORKERS)
+    pending = {}
+
+    def collect(done):
+        for fut in done:
+            name, note_id, digest = pending.pop(fut)
+            data, seconds = fut.result()
+            metrics.observe("export_render_seconds", seconds, format=fmt)
+            if Config.EXPORT_CACHE_DIR:
+                write_artifact(artifact_path(note_id, fmt, digest), data)
+            yield name, data
+
+    for name, note_id, notes_text, tree in items:
+        digest = content_hash(notes_text)
+        cached = read_artifact(artifact_path(note_id, fmt, digest)) if Config.EXPORT_CACHE_DIR else None
+        if cached is not None:
+            yield name, cached
+            continue
+        if pool is None:
+            yield name, get_export(note_id, notes_text, fmt, tree)
+            continue
+
+        pending[pool.submit(render_timed, tree or notes_text, fmt)] = (name, note_id, digest)
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        yield from collect(done)
+
+
+def stream_zip(items, fmt):
+    """Generator of ZIP bytes; each entry is flushed as soon as it's rendered."""
+    sink = ZipSink()
+    # PDF and DOCX are already compressed, so store them as-is
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in iter_exports(items, fmt):
+            zf.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
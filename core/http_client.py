@@ -0,0 +1,158 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from config import Config
+from core import metrics
+
+# One timeout policy for every provider call: (connect, read) seconds.
+DEFAULT_TIMEOUT = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+# Streaming a whole recording up takes longer than a JSON round trip.
+UPLOAD_TIMEOUT = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_UPLOAD_TIMEOUT)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to send twice. Other methods (POST: transcript jobs, completions) are
+# only retried when the request can't have reached the server.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+NOT_PROCESSED_STATUSES = {429}
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10.0
+
+_lock = threading.Lock()
+_sessions = {}
+_sessions_pid = None
+_stats = {}
+
+
+def get_session(host):
+    """Keep-alive session per provider host, rebuilt after fork (gunicorn / celery prefork)."""
+    global _sessions_pid
+    with _lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def retry_delay(attempt, retry_after=None):
+    """Honour Retry-After when given, else exponential backoff with full jitter."""
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def record(host, seconds, error=False, retried=False):
+    with _lock:
+        s = _stats.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0
+        })
+        s["requests"] += 1
+        s["errors"] += int(error)
+        s["retries"] += int(retried)
+        s["total_seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+    metrics.observe("provider_request_seconds", seconds, host=host)
+    if error:
+        metrics.inc("provider_errors_total", host=host)
+    if retried:
+        metrics.inc("provider_retries_total", host=host)
+
+
+def get_stats():
+    """Per-host request/error/retry counters and latency for this process."""
+    with _lock:
+        out = {}
+        for host, s in _stats.items():
+            out[host] = dict(s, avg_seconds=s["total_seconds"] / s["requests"] if s["requests"] else 0.0)
+        return out
+
+
+def _body_position(body):
+    """Where to rewind a file-like body before a retry; None if it can't be replayed."""
+    if body is None or isinstance(body, (bytes, str, dict, list, tuple)):
+        return 0
+    try:
+        return body.tell()
+    except Exception:
+        return None
+
+
+def never_sent(exc):
+    """True if the request failed before reaching the server (connect timeout / refused)."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, (NewConnectionError, ConnectionRefusedError))
+
+
+def request(method, url, retries=None, timeout=None, idempotent=None, **kwargs):
+    """
+    requests-compatible call over the pooled session for the URL's host.
+    Idempotent calls (by method, or idempotent=True) retry connection errors,
+    timeouts, 429 and 5xx with jittered backoff; others only retry failed
+    connects and 429, so a request the server may have acted on is never
+    repeated. Streams that can't be rewound are never retried.
+    """
+    host = urlsplit(url).netloc
+    session = get_session(host)
+    retries = Config.HTTP_RETRIES if retries is None else retries
+    body = kwargs.get("data")
+    body_pos = _body_position(body)
+    can_retry = body_pos is not None
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    retry_statuses = RETRY_STATUSES if idempotent else NOT_PROCESSED_STATUSES
+
+    attempt = 0
+    while True:
+        if attempt and hasattr(body, "seek"):
+            body.seek(body_pos)
+
+        started = time.perf_counter()
+        try:
+            resp = session.request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retry = can_retry and attempt < retries and (idempotent or never_sent(e))
+            record(host, time.perf_counter() - started, error=True, retried=retry)
+            if not retry:
+                raise
+            time.sleep(retry_delay(attempt))
+            attempt += 1
+            continue
+
+        elapsed = time.perf_counter() - started
+        if resp.status_code in retry_statuses and can_retry and attempt < retries:
+            record(host, elapsed, error=True, retried=True)
+            delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+            resp.close()
+            print(f"🔁 [HTTP] {method} {host} → {resp.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        record(host, elapsed, error=resp.status_code >= 400)
+        return resp
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
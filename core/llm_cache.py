@@ -0,0 +1,103 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from core.redis_client import get_redis
+
+KEY_PREFIX = "llm:"
+# Don't cache responses bigger than this (notes are a few KB)
+MAX_VALUE_BYTES = 256 * 1024
+
+_lock = threading.Lock()
+_local = OrderedDict()   # key -> (expires_at, value), most recently used last
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+
+def cache_key(model, params, messages):
+    """Stable hash of everything that determines the completion."""
+    raw = json.dumps({"model": model, "params": params, "messages": messages},
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _bump(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _local_get(key):
+    with _lock:
+        hit = _local.get(key)
+        if hit is None:
+            return None
+        expires_at, value = hit
+        if expires_at < time.time():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        _stats["local_hits"] += 1
+        return value
+
+
+def _local_put(key, value, ttl):
+    with _lock:
+        _local[key] = (time.time() + ttl, value)
+        _local.move_to_end(key)
+        while len(_local) > Config.LLM_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def get(key):
+    """Cached completion for key: in-process LRU first, then Redis."""
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    value = _local_get(key)
+    if value is not None:
+        return value
+
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.get(KEY_PREFIX + key)
+            pipe.ttl(KEY_PREFIX + key)
+            raw, ttl = pipe.execute()
+            if raw is not None:
+                value = raw.decode("utf-8")
+                _local_put(key, value, ttl if ttl and ttl > 0 else Config.LLM_CACHE_TTL)
+                _bump("redis_hits")
+                return value
+        except Exception as e:
+            print(f"⚠️ [LLM Cache] Redis get failed: {e}")
+            _bump("errors")
+
+    _bump("misses")
+    return None
+
+
+def put(key, value):
+    if not Config.LLM_CACHE_ENABLED or not value or len(value.encode("utf-8")) > MAX_VALUE_BYTES:
+        return
+    _local_put(key, value, Config.LLM_CACHE_TTL)
+    _bump("stores")
+    r = get_redis()
+    if r is not None:
+        try:
+            r.setex(KEY_PREFIX + key, Config.LLM_CACHE_TTL, value.encode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ [LLM Cache] Redis set failed: {e}")
+            _bump("errors")
+
+
+def get_stats():
+    with _lock:
+        return dict(_stats, local_entries=len(_local))
+
+
+def clear_local():
+    with _lock:
+        _local.clear()
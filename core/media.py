@@ -0,0 +1,295 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+from config import Config
+
+# Containers that may carry a video stream next to the audio
+VIDEO_EXTS = {"mp4", "webm", "m4a", "mov", "mkv"}
+MEDIA_EXTS = VIDEO_EXTS | {"mp3", "wav", "ogg", "flac"}
+
+# Audio codec → container it can be stream-copied into (all accepted by AssemblyAI)
+COPY_CONTAINERS = {
+    "aac": "m4a",
+    "mp3": "mp3",
+    "opus": "ogg",
+    "vorbis": "ogg",
+    "flac": "flac",
+}
+
+
+def ffmpeg_bin():
+    """System ffmpeg (installed in the Docker image), else the imageio-ffmpeg binary."""
+    if Config.FFMPEG_BIN:
+        return Config.FFMPEG_BIN
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def ffprobe_bin():
+    sibling = os.path.join(os.path.dirname(ffmpeg_bin()), "ffprobe")
+    return sibling if os.path.exists(sibling) else shutil.which("ffprobe")
+
+
+def run_ffmpeg(args):
+    cmd = [ffmpeg_bin(), "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *args]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return result
+
+
+def probe_media(path):
+    """
+    Container facts from ffprobe: {"duration", "audio_codec", "has_video"}.
+    Returns None when ffprobe isn't available.
+    """
+    probe = ffprobe_bin()
+    if not probe:
+        return None
+    result = subprocess.run(
+        [probe, "-v", "error", "-show_entries", "stream=codec_type,codec_name:format=duration",
+         "-of", "json", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()[-500:]}")
+
+    data = json.loads(result.stdout or "{}")
+    streams = data.get("streams", [])
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    try:
+        duration = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        "duration": duration,
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "has_video": any(s.get("codec_type") == "video" for s in streams),
+    }
+
+
+def extract_audio(src, duration=None):
+    """
+    Audio-only file for `src`, cut to the first `duration` seconds when given.
+    Stream-copies the audio track when its codec is already acceptable and
+    transcodes with ffmpeg otherwise. Returns `src` untouched when it is
+    already plain audio and no cut was requested.
+    """
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"Video not found: {src}")
+
+    ext = src.rsplit(".", 1)[-1].lower()
+    info = probe_media(src) if ext in MEDIA_EXTS else None
+    if info is not None and not info["audio_codec"]:
+        raise RuntimeError("No audio track found in video!")
+
+    has_video = info["has_video"] if info else ext in VIDEO_EXTS - {"m4a"}
+    if not duration and not has_video:
+        return src
+
+    base = src.rsplit(".", 1)[0] + "_audio"
+    cut = ["-t", str(duration)] if duration else []
+
+    container = COPY_CONTAINERS.get(info["audio_codec"]) if info else None
+    if container:
+        out = f"{base}.{container}"
+        try:
+            run_ffmpeg(["-i", src, *cut, "-map", "0:a:0", "-vn", "-c:a", "copy", out])
+            return out
+        except RuntimeError as e:
+            print(f"⚠️ [Extract] Stream copy failed, transcoding instead: {e}")
+
+    out = f"{base}.mp3"
+    run_ffmpeg(["-i", src, *cut, "-map", "0:a:0", "-vn", "-c:a", "libmp3lame", "-b:a", "96k", out])
+    return out
+
+
+# --- Speech preprocessing: mono / 16 kHz / silence trimmed / compact codec ---
+SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+PROGRESS_TIME_RE = re.compile(r"time=(\d+):(\d+):([\d.]+)")
+
+
+def detect_silences(src, threshold_db=-45, min_silence=0.5):
+    """Silent stretches [(start, end), ...] and total duration, via ffmpeg silencedetect."""
+    cmd = [ffmpeg_bin(), "-hide_banner", "-stats", "-nostdin", "-i", src,
+           "-af", f"silencedetect=noise={threshold_db}dB:d={min_silence}", "-f", "null", "-"]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg silencedetect failed: {result.stderr.strip()[-500:]}")
+    return parse_silencedetect(result.stderr)
+
+
+def parse_silencedetect(log):
+    """
+    (silences, duration) from silencedetect's stderr. The duration comes from
+    the container header, or — when that says N/A, as MediaRecorder webm files
+    do — from the last progress `time=`, i.e. how far ffmpeg actually decoded.
+    """
+    m = DURATION_RE.search(log)
+    hms = m.groups() if m else (PROGRESS_TIME_RE.findall(log) or [None])[-1]
+    duration = int(hms[0]) * 3600 + int(hms[1]) * 60 + float(hms[2]) if hms else None
+
+    silences, start = [], None
+    for kind, value in SILENCE_RE.findall(log):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    if start is not None and duration:
+        silences.append((start, duration))  # silent until the end
+    return silences, duration
+
+
+def keep_segments(silences, duration, max_gap):
+    """
+    Source intervals to keep: drops leading/trailing silence and shortens
+    every internal silence to `max_gap` seconds (half kept on each side).
+    Raises ValueError without a duration: the last kept span would have no end.
+    """
+    if not duration:
+        raise ValueError("Recording duration unknown")
+    segments, cursor = [], 0.0
+    for start, end in silences:
+        if start <= 0.05:                        # leading silence
+            cursor = end
+            continue
+        if end >= duration - 0.05:               # trailing silence
+            segments.append((cursor, start))
+            cursor = None
+            break
+        if end - start > max_gap:
+            segments.append((cursor, start + max_gap / 2))
+            cursor = end - max_gap / 2
+    if cursor is not None and duration > cursor:
+        segments.append((cursor, duration))
+    return [(round(a, 3), round(b, 3)) for a, b in segments if b - a > 0.01]
+
+
+def build_time_map(segments):
+    """[[processed_start, source_start, length], ...] for mapping timestamps back."""
+    out, t = [], 0.0
+    for a, b in segments:
+        out.append([round(t, 3), a, round(b - a, 3)])
+        t += b - a
+    return out
+
+
+def to_source_time(seconds, time_map):
+    """Processed-audio timestamp → original recording timestamp."""
+    if not time_map:
+        return seconds
+    for out_start, src_start, length in reversed(time_map):
+        if seconds >= out_start:
+            return src_start + min(seconds - out_start, length)
+    return seconds
+
+
+def to_processed_time(seconds, time_map):
+    """Original recording timestamp → processed-audio timestamp (cut stretches collapse to their edge)."""
+    if not time_map:
+        return seconds
+    for out_start, src_start, length in reversed(time_map):
+        if seconds >= src_start:
+            return out_start + min(seconds - src_start, length)
+    return 0.0
+
+
+def map_silences(silences, time_map):
+    """Silences found in the original → where they remain in the processed audio."""
+    mapped = []
+    for start, end in silences:
+        a, b = to_processed_time(start, time_map), to_processed_time(end, time_map)
+        if b - a > 0.01:
+            mapped.append((round(a, 3), round(b, 3)))
+    return mapped
+
+
+def preprocess_for_speech(src):
+    """
+    Mono 16 kHz speech-optimized copy of `src` with leading/trailing silence
+    trimmed and long pauses compressed, encoded as Opus (MP3 fallback).
+    Returns (path, report, silences): report holds sizes, durations and the
+    time map; silences are in processed time, ready for split_on_silence, so
+    the recording isn't decoded a second time just to find cut points.
+    """
+    silences, duration = detect_silences(
+        src, Config.SILENCE_THRESHOLD_DB, Config.SILENCE_MIN_SECONDS
+    )
+    segments = keep_segments(silences, duration, Config.SILENCE_MAX_GAP)
+    if not segments:
+        raise RuntimeError("Recording is silent")
+
+    filters = []
+    if len(segments) > 1 or segments[0] != (0.0, round(duration, 3)):
+        expr = "+".join(f"between(t,{a},{b})" for a, b in segments)
+        filters.append(f"aselect='{expr}',asetpts=N/SR/TB")
+    af = ["-af", ",".join(filters)] if filters else []
+
+    base = src.rsplit(".", 1)[0] + "_speech"
+    out = f"{base}.ogg"
+    common = ["-i", src, "-map", "0:a:0", "-vn", *af, "-ac", "1", "-ar", "16000"]
+    try:
+        run_ffmpeg([*common, "-c:a", "libopus", "-b:a", "24k", "-application", "voip", out])
+    except RuntimeError as e:
+        print(f"⚠️ [Preprocess] Opus unavailable, using MP3: {e}")
+        out = f"{base}.mp3"
+        run_ffmpeg([*common, "-c:a", "libmp3lame", "-b:a", "32k", out])
+
+    original_bytes = os.path.getsize(src)
+    processed_bytes = os.path.getsize(out)
+    time_map = build_time_map(segments)
+    report = {
+        "original_bytes": original_bytes,
+        "processed_bytes": processed_bytes,
+        "size_ratio": round(original_bytes / processed_bytes, 2) if processed_bytes else None,
+        "original_duration": round(duration, 3),
+        "processed_duration": round(sum(b - a for a, b in segments), 3),
+        "time_map": time_map,
+    }
+    return out, report, map_silences(silences, time_map)
+
+
+# --- Segmenting long recordings at silences ---
+def plan_segments(silences, duration, max_len):
+    """
+    (start, end) spans of at most `max_len` seconds, cut in the middle of a
+    silence where one falls in the second half of the window, hard cut otherwise.
+    """
+    cuts = [(a + b) / 2 for a, b in silences]
+    segments, start = [], 0.0
+    while duration - start > max_len:
+        limit = start + max_len
+        candidates = [c for c in cuts if start + max_len / 2 < c <= limit]
+        cut = max(candidates) if candidates else limit
+        segments.append((round(start, 3), round(cut, 3)))
+        start = cut
+    segments.append((round(start, 3), round(duration, 3)))
+    return segments
+
+
+def split_on_silence(src, max_len, silences=None, duration=None):
+    """
+    [(offset_seconds, path), ...]; just [(0.0, src)] when the audio is short enough.
+    Pass `silences` and `duration` when they're already known (from preprocessing).
+    """
+    if silences is None or not duration:
+        silences, duration = detect_silences(src, Config.SILENCE_THRESHOLD_DB, min_silence=0.3)
+    if not duration or duration <= max_len:
+        return [(0.0, src)]
+
+    base, ext = src.rsplit(".", 1)
+    pieces = []
+    for i, (start, end) in enumerate(plan_segments(silences, duration, max_len)):
+        path = f"{base}_seg{i:03d}.{ext}"
+        run_ffmpeg(["-ss", f"{start:.3f}", "-i", src, "-t", f"{end - start:.3f}",
+                    "-map", "0:a:0", "-c:a", "copy", path])
+        pieces.append((start, path))
+    return pieces
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from core.redis_client import get_redis
+
+# In-process counters and histograms, exposed in Prometheus text format at
+# /api/metrics. Web and Celery processes push their deltas to Redis hashes
+# every FLUSH_INTERVAL seconds (Celery also after each task), so one scrape
+# sees the whole deployment; without Redis each process reports its own.
+PREFIX = "talktotext_"
+REDIS_PREFIX = "metrics:"
+FLUSH_INTERVAL = 5.0
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+METRICS = {
+    "stage_seconds": ("histogram", "Time spent in a pipeline stage (per invocation)"),
+    "provider_request_seconds": ("histogram", "Outbound provider request latency"),
+    "provider_errors_total": ("counter", "Failed provider requests (network errors, 4xx/5xx)"),
+    "provider_retries_total": ("counter", "Provider requests that were retried"),
+    "export_render_seconds": ("histogram", "PDF/DOCX render time"),
+    "http_request_seconds": ("histogram", "API request latency by blueprint"),
+    "password_hash_seconds": ("histogram", "Password hash/check (KDF) time"),
+    "password_hash_rejected_total": ("counter", "Sign-ins turned away because the hash pool was full"),
+    "auth_token_cache_total": ("counter", "Verified-token cache lookups by result"),
+}
+
+_lock = threading.Lock()
+_totals = {}    # (name, labels) -> [bucket counts..., sum, count] or [value]
+_pending = {}   # same shape, not yet pushed to Redis
+_last_flush = 0.0
+
+
+def _empty(name):
+    return [0.0] * (len(BUCKETS) + 3) if METRICS[name][0] == "histogram" else [0.0]
+
+
+def _add(store, key, value):
+    row = store.setdefault(key, _empty(key[0]))
+    if len(row) == 1:
+        row[0] += value
+        return
+    for i, bound in enumerate(BUCKETS):
+        if value <= bound:
+            row[i] += 1
+            break
+    else:
+        row[len(BUCKETS)] += 1   # +Inf
+    row[-2] += value
+    row[-1] += 1
+
+
+def _record(name, value, labels):
+    key = (name, json.dumps(labels, sort_keys=True))
+    with _lock:
+        _add(_totals, key, value)
+        _add(_pending, key, value)
+        due = time.time() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def observe(name, seconds, **labels):
+    _record(name, seconds, labels)
+
+
+def inc(name, value=1, **labels):
+    _record(name, value, labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def flush():
+    """Push this process's pending deltas to Redis."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.time()
+    r = get_redis()
+    if r is None or not pending:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for (name, labels), row in pending.items():
+            for i, value in enumerate(row):
+                if value:
+                    pipe.hincrbyfloat(REDIS_PREFIX + name, f"{labels}|{i}", value)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ [Metrics] Redis flush failed: {e}")
+        with _lock:
+            for key, row in pending.items():
+                merged = _pending.setdefault(key, _empty(key[0]))
+                for i, value in enumerate(row):
+                    merged[i] += value
+
+
+def collect():
+    """{(name, labels_json): row}: deployment-wide from Redis, else this process only."""
+    flush()
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for name in METRICS:
+                pipe.hgetall(REDIS_PREFIX + name)
+            rows = {}
+            for name, raw in zip(METRICS, pipe.execute()):
+                for field, value in raw.items():
+                    labels, i = field.decode("utf-8").rsplit("|", 1)
+                    rows.setdefault((name, labels), _empty(name))[int(i)] = float(value)
+            return rows
+        except Exception as e:
+            print(f"⚠️ [Metrics] Redis read failed, reporting this process only: {e}")
+    with _lock:
+        return {key: list(row) for key, row in _totals.items()}
+
+
+def _labels(labels, **extra):
+    pairs = dict(json.loads(labels), **extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in pairs.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(pairs, escaped)) + "}"
+
+
+def _num(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render():
+    """Prometheus text exposition format (version 0.0.4)."""
+    rows = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for (metric, labels), row in sorted(rows.items()):
+            if metric != name:
+                continue
+            if kind == "counter":
+                lines.append(f"{full}{_labels(labels)} {_num(row[0])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), row):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(labels, le=bound)} {_num(cumulative)}")
+            lines.append(f"{full}_sum{_labels(labels)} {_num(row[-2])}")
+            lines.append(f"{full}_count{_labels(labels)} {_num(row[-1])}")
+    return "\n".join(lines) + "\n"
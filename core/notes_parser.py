@@ -0,0 +1,50 @@
+import re
+
+# Node kinds in the notes tree (stored on the note as "notes_tree")
+HEADING = "h"       # ## Section
+BULLET = "li"       # - item / * item
+NUMBERED = "ol"     # 1. item (number kept in the text)
+PARAGRAPH = "p"
+BLANK = "br"
+
+BULLET_RE = re.compile(r"^[-*]\s+")
+NUMBERED_RE = re.compile(r"^\d+\.\s+")
+
+# Characters of the notes kept as the history preview
+PREVIEW_CHARS = 120
+
+
+def parse_notes(notes_text):
+    """
+    Single pass over the generated markdown → compact list of [kind, text]
+    nodes. Exporters render this tree instead of re-parsing the text.
+    """
+    tree = []
+    for line in (notes_text or "").splitlines():
+        line = line.strip()
+        if not line:
+            tree.append([BLANK, ""])
+        elif line.startswith("##"):
+            tree.append([HEADING, line.replace("##", "").strip()])
+        elif BULLET_RE.match(line):
+            tree.append([BULLET, line[2:].strip()])
+        elif NUMBERED_RE.match(line):
+            tree.append([NUMBERED, line])
+        else:
+            tree.append([PARAGRAPH, line])
+    return tree
+
+
+def as_tree(notes):
+    """Accept a stored tree, raw notes text, or a list of lines."""
+    if isinstance(notes, str):
+        return parse_notes(notes)
+    notes = list(notes or [])
+    if notes and isinstance(notes[0], str):
+        return parse_notes("\n".join(notes))
+    return notes
+
+
+def summary_preview(notes_text, length=PREVIEW_CHARS):
+    """Short teaser shown in history lists; stored on the note at write time."""
+    return (notes_text[:length] + "...") if notes_text else ""
@@ -0,0 +1,78 @@
+import os
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from core import http_client
+
+FONT_NAME = "NotoSans"
+FONT_DIR = "storage/fonts"
+FONT_PATH = os.path.join(FONT_DIR, "NotoSans.ttf")
+
+_lock = threading.Lock()
+_styles = None
+
+
+# --- Font setup for PDF (Unicode safe) ---
+def ensure_font():
+    """Download NotoSans variable font from Google Fonts repo if not available."""
+    os.makedirs(FONT_DIR, exist_ok=True)
+    if not os.path.exists(FONT_PATH):
+        print("🔽 Downloading NotoSans.ttf ...")
+        url = ("https://github.com/google/fonts/raw/main/ofl/notosans/"
+               "NotoSans%5Bwdth,wght%5D.ttf")
+        r = http_client.get(url, timeout=http_client.UPLOAD_TIMEOUT)
+        r.raise_for_status()
+        with open(FONT_PATH, "wb") as f:
+            f.write(r.content)
+        print("✅ NotoSans font downloaded!")
+
+
+def build_styles():
+    base = getSampleStyleSheet()
+    return {
+        "heading": ParagraphStyle(
+            "Heading",
+            parent=base["Heading2"],
+            fontName=FONT_NAME,
+            fontSize=14,
+            leading=18,
+            spaceAfter=10,
+            textColor=colors.HexColor("#222222"),
+        ),
+        "body": ParagraphStyle(
+            "Body",
+            parent=base["Normal"],
+            fontName=FONT_NAME,
+            fontSize=12,
+            leading=16,
+            spaceAfter=8,
+        ),
+        "bullet": ParagraphStyle(
+            "Bullet",
+            parent=base["Normal"],
+            fontName=FONT_NAME,
+            fontSize=12,
+            leading=16,
+            leftIndent=20,
+            bulletIndent=10,
+            spaceAfter=6,
+        ),
+    }
+
+
+def get_pdf_styles():
+    """Register the font and build the stylesheet once per process."""
+    global _styles
+    if _styles is not None:
+        return _styles
+    with _lock:
+        if _styles is None:
+            ensure_font()  # Ensure NotoSans font is available
+            if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+            _styles = build_styles()
+    return _styles
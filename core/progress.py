@@ -0,0 +1,99 @@
+import json
+import time
+
+from config import Config
+from core.redis_client import get_redis
+
+# Latest progress per upload lives in a Redis hash; every change is also
+# published on the upload's channel for the SSE endpoint.
+STATE_KEY = "progress:{}"
+CHANNEL = "progress:{}:events"
+FINAL_STATUSES = {"done", "failed"}
+HEARTBEAT_SECONDS = 15
+
+
+def _decode(raw):
+    """Redis hash (bytes) → the /status response shape."""
+    h = {k.decode("utf-8"): v.decode("utf-8") for k, v in raw.items()}
+    state = {
+        "status": h.get("status"),
+        "note_id": h.get("note_id"),
+        "progress": {"stage": h.get("stage"), "percent": int(h.get("percent") or 0)},
+        "extract_duration": float(h.get("extract_duration") or 0),
+    }
+    if h.get("tokens"):
+        state["progress"]["tokens"] = json.loads(h["tokens"])
+    if h.get("error"):
+        state["error"] = h["error"]
+    return state
+
+
+def publish(upload_id, **fields):
+    """
+    Merge fields into the upload's progress hash and notify subscribers.
+    Returns True when the stage changed, False when it didn't, and None when
+    Redis is unavailable (callers should then persist to Mongo themselves).
+    """
+    r = get_redis()
+    if r is None:
+        return None
+    key = STATE_KEY.format(upload_id)
+    mapping = {k: json.dumps(v) if isinstance(v, dict) else str(v) for k, v in fields.items() if v is not None}
+    try:
+        pipe = r.pipeline(transaction=True)
+        pipe.hget(key, "stage")
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, Config.PROGRESS_TTL)
+        pipe.hgetall(key)
+        previous, _, _, raw = pipe.execute()
+        r.publish(CHANNEL.format(upload_id), json.dumps(_decode(raw)))
+    except Exception as e:
+        print(f"⚠️ [Progress] Redis publish failed for {upload_id}: {e}")
+        return None
+    if "stage" not in fields:
+        return False
+    return previous is None or previous.decode("utf-8") != str(fields["stage"])
+
+
+def get_state(upload_id):
+    """Latest progress from Redis, or None (unknown upload, expired, or no Redis)."""
+    r = get_redis()
+    if r is None:
+        return None
+    try:
+        raw = r.hgetall(STATE_KEY.format(upload_id))
+    except Exception as e:
+        print(f"⚠️ [Progress] Redis read failed for {upload_id}: {e}")
+        return None
+    return _decode(raw) if raw else None
+
+
+def iter_events(upload_id, timeout=None):
+    """
+    Current state, then each published change, until the upload is done or
+    failed or `timeout` seconds pass. Yields None as a heartbeat while idle.
+    """
+    r = get_redis()
+    if r is None:
+        return
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(CHANNEL.format(upload_id))
+    try:
+        # read after subscribing so no change falls in between
+        state = get_state(upload_id)
+        if state:
+            yield state
+            if state["status"] in FINAL_STATUSES:
+                return
+        deadline = time.time() + (timeout or Config.PROGRESS_STREAM_TIMEOUT)
+        while time.time() < deadline:
+            message = pubsub.get_message(timeout=max(0.1, min(HEARTBEAT_SECONDS, deadline - time.time())))
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            yield event
+            if event["status"] in FINAL_STATUSES:
+                return
+    finally:
+        pubsub.close()
@@ -1,23 +1,60 @@
-import requests
+import threading
+
+from core import http_client, llm_cache
+from core.tokens import count_messages, completion_budget
 from config import Config
 
-def call_groq(prompt, max_tokens=800):
-    url = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.1-8b-instant"   # Groq ka free + powerful model
+
+_usage_lock = threading.Lock()
+
+
+def add_usage(usage, data):
+    """Accumulate provider-reported token usage into `usage` (shared across threads)."""
+    if usage is None or not data:
+        return
+    with _usage_lock:
+        if "cache_hits" in data:
+            usage["cache_hits"] = usage.get("cache_hits", 0) + data["cache_hits"]
+            return
+        for key in ("prompt_tokens", "completion_tokens"):
+            usage[key] = usage.get(key, 0) + int(data.get(key, 0))
+        usage["llm_calls"] = usage.get("llm_calls", 0) + 1
+
+
+def call_groq(prompt, max_tokens=800, usage=None):
+    url = f"{Config.GROQ_BASE_URL}/chat/completions"
     headers = {
         "Authorization": f"Bearer {Config.LLM_API_KEY}",
         "Content-Type": "application/json"
     }
+    messages = [
+        {"role": "system", "content": "You are a meeting notes generator."},
+        {"role": "user", "content": prompt}
+    ]
+    # size the completion from the actual prompt instead of a fixed guess
+    max_tokens = completion_budget(GROQ_MODEL, count_messages(messages), max_tokens)
     data = {
-        "model": "llama-3.1-8b-instant",   # Groq ka free + powerful model
-        "messages": [
-            {"role": "system", "content": "You are a meeting notes generator."},
-            {"role": "user", "content": prompt}
-        ],
+        "model": GROQ_MODEL,
+        "messages": messages,
         "max_tokens": max_tokens
     }
-    r = requests.post(url, json=data, headers=headers, timeout=60)
+
+    # identical prompt seen recently (retried task, duplicate upload)?
+    key = llm_cache.cache_key(GROQ_MODEL, {"max_tokens": max_tokens}, messages)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        add_usage(usage, {"cache_hits": 1})
+        return cached
+
+    # a completion has no side effects beyond cost: retry 5xx and timeouts too
+    r = http_client.post(url, json=data, headers=headers, idempotent=True)
     r.raise_for_status()
-    return r.json()["choices"][0]["message"]["content"]
+    body = r.json()
+    add_usage(usage, body.get("usage"))
+    content = body["choices"][0]["message"]["content"]
+    llm_cache.put(key, content)
+    return content
 
 def call_llm(prompt, **kwargs):
     return call_groq(prompt, **kwargs)
@@ -0,0 +1,29 @@
+import os
+import threading
+
+from config import Config
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_redis():
+    """
+    Shared Redis client (the same instance Celery uses), one per process.
+    Returns None if the redis package isn't installed or REDIS_URL is empty.
+    """
+    global _client, _client_pid
+    if not Config.REDIS_URL:
+        return None
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            try:
+                import redis
+            except ImportError:
+                return None
+            _client = redis.Redis.from_url(
+                Config.REDIS_URL, socket_timeout=2, socket_connect_timeout=2
+            )
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,263 @@
+"""
+Full-text search over a user's notes and transcripts (/api/search).
+
+Every saved note gets one doc in `search_index`: {_id: note id, user_id,
+notes, transcript, created_at}. Two ways to rank it (Config.SEARCH_BACKEND):
+
+- "mongo": the (user_id, notes, transcript) text index; every query is
+  pinned to one user by the index prefix, so it never scans other users' notes.
+- "memory": an in-process inverted index with BM25, built per user from
+  `search_index` on first search and kept for the SEARCH_MEMORY_USERS most
+  recent users. Before each search the cached index is checked against
+  `search_index` (note count, newest created_at) and topped up, so notes
+  indexed by the Celery worker show up in the web process too. For setups
+  without a text index (local runs, benchmarks); it holds every cached user's
+  text in RAM.
+
+    python -m core.search    # (re)index notes saved before search existed
+"""
+import html
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from config import Config
+from models.mongo_models import notes, search_index
+
+# notes matches count more than transcript matches
+NOTES_WEIGHT = 3
+TRANSCRIPT_WEIGHT = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 160
+MAX_LIMIT = 50
+
+WORD_RE = re.compile(r"\w+")
+SUFFIXES = ("ings", "ing", "edly", "ed", "es", "s", "ly")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "that", "the", "to", "was", "we", "with",
+}
+
+_lock = threading.Lock()
+_indexes = OrderedDict()   # user_id -> UserIndex (memory backend), LRU
+
+
+def terms(text):
+    return [w for w in WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+
+
+def stem(term):
+    """Crude suffix strip, enough to highlight Mongo's stemmed matches ("meetings" → "meet")."""
+    for suffix in SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[:-len(suffix)]
+    return term
+
+
+class UserIndex:
+    """One user's postings: term -> {note_id: weighted tf}."""
+
+    def __init__(self):
+        self.postings = {}
+        self.lengths = {}
+        self.docs = {}
+        self.newest = None
+
+    def add(self, doc):
+        note_id = doc["_id"]
+        self.remove(note_id)
+        counts = Counter()
+        for t in terms(doc.get("notes")):
+            counts[t] += NOTES_WEIGHT
+        for t in terms(doc.get("transcript")):
+            counts[t] += TRANSCRIPT_WEIGHT
+        for t, tf in counts.items():
+            self.postings.setdefault(t, {})[note_id] = tf
+        self.lengths[note_id] = sum(counts.values())
+        self.docs[note_id] = doc
+        created_at = doc.get("created_at")
+        if created_at and (self.newest is None or created_at > self.newest):
+            self.newest = created_at
+
+    def remove(self, note_id):
+        if note_id not in self.docs:
+            return
+        old = self.docs.pop(note_id)
+        for t in set(terms(old.get("notes")) + terms(old.get("transcript"))):
+            posting = self.postings.get(t)
+            if posting:
+                posting.pop(note_id, None)
+                if not posting:
+                    del self.postings[t]
+        del self.lengths[note_id]
+
+    def search(self, query_terms):
+        """[(score, note_id)], best first."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_len = sum(self.lengths.values()) / n or 1
+        scores = Counter()
+        for t in set(query_terms):
+            posting = self.postings.get(t)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for note_id, tf in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[note_id] / avg_len)
+                scores[note_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(((s, note_id) for note_id, s in scores.items()), key=lambda x: (-x[0], str(x[1])))
+
+
+def load_user_index(user_id):
+    index = UserIndex()
+    for doc in search_index.find({"user_id": user_id}):
+        index.add(doc)
+    return index
+
+
+def get_user_index(user_id):
+    """
+    Cached index for one user, brought up to date with `search_index`: notes
+    newer than the newest cached one are added; if the count still differs
+    (notes deleted, or saved with an older created_at) it's rebuilt.
+    """
+    total = search_index.count_documents({"user_id": user_id})
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+            if len(index.docs) == total:
+                return index
+    if index is not None and index.newest is not None:
+        newer = list(search_index.find({"user_id": user_id, "created_at": {"$gt": index.newest}}))
+        with _lock:
+            for doc in newer:
+                index.add(doc)
+            if len(index.docs) == total:
+                return index
+    index = load_user_index(user_id)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > Config.SEARCH_MEMORY_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def index_note(note_id, user_id, notes_text, transcript, created_at):
+    """Add or refresh one note in the search index (called when a note is saved)."""
+    doc = {
+        "_id": note_id,
+        "user_id": str(user_id),
+        "notes": notes_text or "",
+        "transcript": transcript or "",
+        "created_at": created_at,
+    }
+    search_index.update_one({"_id": note_id}, {"$set": doc}, upsert=True)
+    if Config.SEARCH_BACKEND == "memory":
+        with _lock:
+            index = _indexes.get(doc["user_id"])
+            if index is not None:
+                index.add(doc)
+
+
+def window(text, hits, length):
+    """~`length` chars of `text` around the first hit, hits wrapped in <mark>; HTML-escaped."""
+    start = max(0, hits[0].start() - length // 3)
+    if start:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < hits[0].start() else start
+    end = min(len(text), start + length)
+    parts, pos = [], start
+    for m in hits:
+        if m.start() < start or m.end() > end:
+            continue
+        parts.append(html.escape(text[pos:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group())}</mark>")
+        pos = m.end()
+    parts.append(html.escape(text[pos:end]))
+    return ("…" if start else "") + "".join(parts).strip() + ("…" if end < len(text) else "")
+
+
+def snippet(doc, query_terms, length=SNIPPET_CHARS):
+    """
+    Text around the first hit (notes first). Exact word matches win; failing
+    that, words sharing a term's stem, since Mongo's text index matches
+    stemmed forms the exact pass would miss.
+    """
+    wanted = set(query_terms)
+    stems = {stem(t) for t in query_terms}
+    matchers = (
+        lambda word: word in wanted,
+        lambda word: any(word.startswith(s) for s in stems),
+    )
+    for matches in matchers:
+        for field in ("notes", "transcript"):
+            text = doc.get(field) or ""
+            hits = [m for m in WORD_RE.finditer(text) if matches(m.group().lower())]
+            if hits:
+                return window(text, hits, length)
+    return html.escape((doc.get("notes") or "")[:length])
+
+
+def result(doc, score, query_terms):
+    created_at = doc.get("created_at")
+    return {
+        "note_id": str(doc["_id"]),
+        "score": round(score, 4),
+        "created_at": created_at.isoformat() if created_at else None,
+        "snippet": snippet(doc, query_terms),
+    }
+
+
+def search_mongo(user_id, query, query_terms, limit, offset):
+    match = {"user_id": user_id, "$text": {"$search": query}}
+    total = search_index.count_documents(match)
+    docs = (
+        search_index.find(match, {"score": {"$meta": "textScore"}, "notes": 1, "transcript": 1, "created_at": 1})
+        .sort([("score", {"$meta": "textScore"})])
+        .skip(offset)
+        .limit(limit)
+    )
+    return total, [result(d, d.get("score", 0.0), query_terms) for d in docs]
+
+
+def search_memory(user_id, query_terms, limit, offset):
+    index = get_user_index(user_id)
+    with _lock:
+        ranked = index.search(query_terms)
+        page = [(index.docs[note_id], score) for score, note_id in ranked[offset:offset + limit]]
+    return len(ranked), [result(doc, score, query_terms) for doc, score in page]
+
+
+def search(user_id, query, limit=20, offset=0):
+    """Ranked matches for `query` among one user's notes: {"total", "results"}."""
+    user_id = str(user_id)
+    query_terms = terms(query)
+    if not query_terms:
+        return {"total": 0, "results": []}
+    if Config.SEARCH_BACKEND == "memory":
+        total, results = search_memory(user_id, query_terms, limit, offset)
+    else:
+        total, results = search_mongo(user_id, query, query_terms, limit, offset)
+    return {"total": total, "results": results}
+
+
+def rebuild():
+    """Index every note (for notes saved before search existed)."""
+    from core import transcript_store
+    count = 0
+    projection = {"user_id": 1, "final_notes": 1, "created_at": 1, **{f: 1 for f in transcript_store.FIELDS}}
+    for n in notes.find({}, projection):
+        transcript = transcript_store.load_transcripts(n, ["cleaned_transcript"])["cleaned_transcript"]
+        index_note(n["_id"], n.get("user_id"), n.get("final_notes", ""), transcript, n.get("created_at"))
+        count += 1
+    print(f"🔎 [search] Indexed {count} notes")
+    return count
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,85 @@
+import time
+
+from config import Config
+from core import metrics
+from core.translation import translate_document, split_sentences, pack_batches, BATCH_CHARS
+from core.utils import clean_text, iter_chunks
+
+# Post-transcription stages as composable generators: each stage takes an
+# iterator and yields to the next, so a piece of transcript is translated,
+# cleaned, chunked and sent for summarizing as soon as it exists.
+
+
+def run_stages(source, *stages):
+    """Chain stages over `source`; nothing runs until the result is iterated."""
+    for stage in stages:
+        source = stage(source)
+    return source
+
+
+def split_pieces(text, limit=None):
+    """Whole-sentence pieces of a finished transcript to feed the stages.
+    Pieces are sized so translating one still uses every translation worker."""
+    limit = limit or BATCH_CHARS * Config.TRANSLATION_CONCURRENCY
+    return [" ".join(s for _, s in batch) for batch in pack_batches(enumerate(split_sentences(text or "")), limit)]
+
+
+def merge_report(report, result):
+    """Fold one translate_document result into a running report."""
+    report["complete"] = report.get("complete", True) and result["complete"]
+    for key in ("total_batches", "failed_batches", "cached_sentences"):
+        report[key] = report.get(key, 0) + result[key]
+    return report
+
+
+def translate_stage(target="en", report=None):
+    """(text, lang) → text in `target`; counts go into `report`."""
+    def stage(items):
+        spent = 0.0
+        for text, lang in items:
+            if text and lang and lang.lower() != target:
+                started = time.perf_counter()
+                result = translate_document(text, src=lang, target=target)
+                spent += time.perf_counter() - started
+                if report is not None:
+                    merge_report(report, result)
+                yield result["text"]
+            else:
+                yield text
+        if spent:
+            metrics.observe("stage_seconds", spent, stage="translate")
+    return stage
+
+
+def clean_stage(items):
+    spent = 0.0
+    for text in items:
+        started = time.perf_counter()
+        cleaned = clean_text(text)
+        spent += time.perf_counter() - started
+        yield cleaned
+    metrics.observe("stage_seconds", spent, stage="optimize")
+
+
+def tee_stage(sink):
+    """Pass items through, keeping a copy in `sink`."""
+    def stage(items):
+        for item in items:
+            sink.append(item)
+            yield item
+    return stage
+
+
+def chunk_stage(chunk_chars, overlap_chars):
+    """Text pieces → overlapping chunks, each emitted once its end is known."""
+    def stage(items):
+        return iter_chunks(items, chunk_chars, overlap_chars)
+    return stage
+
+
+def summarize_stage(pool, summarize):
+    """Chunks → futures; summarize(index, chunk) starts on `pool` right away."""
+    def stage(items):
+        for index, chunk in enumerate(items):
+            yield pool.submit(summarize, index, chunk)
+    return stage
@@ -1,49 +1,142 @@
 from celery_worker import celery
-from core.ai_pipeline import process_upload
+from celery.signals import task_postrun
+from core.ai_pipeline import (
+    start_upload, finish_upload, advance_transcription, fail_upload, poll_delay
+)
+from core.exports import prerender_all
+from core import metrics
+from models.mongo_models import notes
+from config import Config
+from bson import ObjectId
 import os
 import traceback
 
+# Give up on a transcription that's still pending after this many checks
+# (~1.5h with the default backoff).
+MAX_POLL_ATTEMPTS = 200
+
+
+def transcription_webhook_url():
+    """Public URL AssemblyAI should call when a job finishes (optional)."""
+    return Config.TRANSCRIPTION_WEBHOOK_URL or None
+
+
+@task_postrun.connect
+def flush_metrics(**kwargs):
+    """Push this worker's timings to Redis once a task ends (see core/metrics.py)."""
+    metrics.flush()
+
+
+def remove_local_file(file_path):
+    """Try cleaning up local file if it exists (to save disk space)."""
+    try:
+        # Check direct path
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            print(f"🧹 [Cleanup] Deleted local file: {file_path}")
+        else:
+            # Check relative path (e.g., "storage/uploads/...mp3")
+            abs_path = os.path.join(os.getcwd(), file_path)
+            if os.path.exists(abs_path):
+                os.remove(abs_path)
+                print(f"🧹 [Cleanup] Deleted local file: {abs_path}")
+    except Exception as cleanup_err:
+        print(f"⚠️ [Cleanup Error] Could not delete file: {cleanup_err}")
+
+
+def json_safe(result):
+    """Convert Mongo ObjectIds to string for JSON-safe return."""
+    if isinstance(result, dict):
+        if "_id" in result:
+            result["_id"] = str(result["_id"])
+        if "note_id" in result:
+            result["note_id"] = str(result["note_id"])
+    return result
+
 
 @celery.task(name="tasks.process_upload_task")
-def process_upload_task(upload_id, file_path, user_id, language=None):
+def process_upload_task(upload_id, file_path, user_id, language=None, extract_duration=0, is_url=False):
     """
     Background Celery task for processing uploads.
-    Cleans up temporary local files (like meeting_audio.mp3)
-    after successful transcription.
+    Uploads arrive as local files (or meeting URLs, downloaded here); this
+    task forwards them to the speech provider and submits the transcription,
+    then frees the worker slot. check_transcription_task picks the job up from there.
     """
 
     try:
         print(f"🚀 [Celery Task] Starting process for upload_id={upload_id}")
 
-        # 1️⃣ Run the AI processing pipeline (AssemblyAI, translation, summarization)
-        result = process_upload(upload_id, file_path, user_id, language=language)
-        print(f"✅ [Celery Task] Upload {upload_id} processed successfully.")
+        # 1️⃣ Download / extract / upload / submit (or hit the transcript cache)
+        state = start_upload(
+            upload_id, file_path, user_id, language=language, is_url=is_url,
+            extract_duration=extract_duration, webhook_url=transcription_webhook_url()
+        )
+
+        # 2️⃣ File is with the provider now (or not needed): clean it up
+        # (start_upload removes its own download for URLs)
+        if not is_url:
+            remove_local_file(file_path)
 
-        # 2️⃣ Try cleaning up local file if it exists (to save disk space)
-        try:
-            # Check direct path
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"🧹 [Cleanup] Deleted local file: {file_path}")
-            else:
-                # Check relative path (e.g., "storage/uploads/...mp3")
-                abs_path = os.path.join(os.getcwd(), file_path)
-                if os.path.exists(abs_path):
-                    os.remove(abs_path)
-                    print(f"🧹 [Cleanup] Deleted local file: {abs_path}")
-        except Exception as cleanup_err:
-            print(f"⚠️ [Cleanup Error] Could not delete file: {cleanup_err}")
-
-        # 3️⃣ Convert Mongo ObjectIds to string for JSON-safe return
-        if isinstance(result, dict):
-            if "_id" in result:
-                result["_id"] = str(result["_id"])
-            if "note_id" in result:
-                result["note_id"] = str(result["note_id"])
-
-        return result
+        if "transcript" in state:
+            result = finish_upload(upload_id, user_id, *state["transcript"])
+            print(f"✅ [Celery Task] Upload {upload_id} processed successfully.")
+            schedule_prerender(result)
+            return json_safe(result)
+
+        # 3️⃣ Schedule the first status check instead of blocking on it
+        check_transcription_task.apply_async((upload_id,), countdown=poll_delay(0))
+        return {"upload_id": upload_id, "segments": state["segments"]}
 
     except Exception as e:
         print("❌ [Celery Task Error]", e)
         traceback.print_exc()
+        fail_upload(upload_id, e)
+        return {"error": str(e)}
+
+
+@celery.task(name="tasks.check_transcription_task")
+def check_transcription_task(upload_id, attempt=0, reschedule=True):
+    """
+    Check a submitted transcription once. While it's still running,
+    re-queue with a growing countdown so no worker sits idle waiting.
+    Webhook-triggered checks pass reschedule=False (the poll chain is
+    already running as a fallback).
+    """
+    try:
+        step = advance_transcription(upload_id)
+    except Exception as e:
+        # provider hiccup: try again later rather than failing the job
+        print(f"⚠️ [Transcription Check] {upload_id} attempt {attempt}: {e}")
+        step = {"state": "pending", "error": str(e)}
+
+    if step["state"] == "pending" and reschedule:
+        if attempt + 1 >= MAX_POLL_ATTEMPTS:
+            fail_upload(upload_id, "Transcription timed out")
+            return {"error": "Transcription timed out"}
+        check_transcription_task.apply_async(
+            (upload_id,), {"attempt": attempt + 1}, countdown=poll_delay(attempt + 1)
+        )
+    elif step["state"] == "done":
+        print(f"✅ [Celery Task] Upload {upload_id} processed successfully.")
+        schedule_prerender(step)
+
+    return json_safe(step)
+
+
+def schedule_prerender(result):
+    if Config.PRERENDER_EXPORTS and result.get("note_id"):
+        render_exports_task.delay(str(result["note_id"]))
+
+
+@celery.task(name="tasks.render_exports_task")
+def render_exports_task(note_id):
+    """Render PDF + DOCX as soon as the note exists, so the first download is a file read."""
+    try:
+        n = notes.find_one({"_id": ObjectId(note_id)}, {"final_notes": 1, "notes_tree": 1})
+        if not n:
+            return {"error": "note not found"}
+        prerender_all(note_id, n.get("final_notes", ""), n.get("notes_tree"))
+        return {"note_id": note_id}
+    except Exception as e:
+        print(f"⚠️ [Pre-render] {note_id}: {e}")
         return {"error": str(e)}
@@ -0,0 +1,116 @@
+import os
+from functools import lru_cache
+
+from config import Config
+
+# Context window and max completion per model. Groq also caps prompt +
+# completion per request on lower tiers, see Config.LLM_MAX_REQUEST_TOKENS.
+MODEL_LIMITS = {
+    "llama-3.1-8b-instant": {"context": 131072, "max_output": 8192},
+}
+DEFAULT_LIMITS = {"context": 8192, "max_output": 2048}
+
+# Chat template overhead per message (role markers, separators)
+MESSAGE_OVERHEAD = 8
+# Headroom for tokenizer drift between our count and the provider's
+SAFETY_MARGIN = 64
+MIN_COMPLETION = 128
+
+
+class ContextOverflow(ValueError):
+    """Prompt leaves no room for a useful completion; don't send it."""
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """
+    Load the tokenizer once per process.
+    Prefers the model's own tokenizer.json (Config.TOKENIZER_PATH, via the
+    `tokenizers` package), then tiktoken's cl100k_base, whose merges are the
+    base of the Llama 3 vocabulary. Returns None if neither is installed.
+    """
+    if Config.TOKENIZER_PATH and os.path.exists(Config.TOKENIZER_PATH):
+        try:
+            from tokenizers import Tokenizer
+            tok = Tokenizer.from_file(Config.TOKENIZER_PATH)
+            return ("hf", tok)
+        except Exception as e:
+            print(f"⚠️ [Tokens] Could not load {Config.TOKENIZER_PATH}: {e}")
+    try:
+        import tiktoken
+        return ("tiktoken", tiktoken.get_encoding("cl100k_base"))
+    except Exception as e:
+        print(f"⚠️ [Tokens] No tokenizer available, using estimates: {e}")
+        return None
+
+
+def encode(text):
+    tok = get_tokenizer()
+    if tok is None:
+        return None
+    kind, impl = tok
+    if kind == "hf":
+        return impl.encode(text, add_special_tokens=False).ids
+    return impl.encode(text, disallowed_special=())
+
+
+def decode(ids):
+    kind, impl = get_tokenizer()
+    return impl.decode(ids)
+
+
+def estimate_tokens(text):
+    """Fallback when no tokenizer is installed: ~4 chars per token for ASCII,
+    ~1 token per char for other scripts (CJK, Devanagari, Arabic ...)."""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return int(ascii_chars / 4.0 + (len(text) - ascii_chars)) + 1
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    ids = encode(text)
+    return len(ids) if ids is not None else estimate_tokens(text)
+
+
+def truncate_tokens(text, max_tokens):
+    """First `max_tokens` tokens of text (decoded back to a string)."""
+    ids = encode(text)
+    if ids is None:
+        # estimate: scale by the text's own chars-per-token ratio
+        ratio = len(text) / max(1, estimate_tokens(text))
+        return text[:int(max_tokens * ratio)]
+    return text if len(ids) <= max_tokens else decode(ids[:max_tokens])
+
+
+def chars_per_token(text):
+    """Observed chars/token for this text; used to size character-based chunks."""
+    return len(text) / max(1, count_tokens(text))
+
+
+def count_messages(messages):
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def model_limits(model):
+    limits = dict(MODEL_LIMITS.get(model, DEFAULT_LIMITS))
+    if Config.LLM_MAX_REQUEST_TOKENS:
+        limits["context"] = min(limits["context"], Config.LLM_MAX_REQUEST_TOKENS)
+    return limits
+
+
+def completion_budget(model, prompt_tokens, desired):
+    """max_tokens to request so prompt + completion fits the model's window."""
+    limits = model_limits(model)
+    available = limits["context"] - prompt_tokens - SAFETY_MARGIN
+    if available < MIN_COMPLETION:
+        raise ContextOverflow(
+            f"Prompt is {prompt_tokens} tokens; {model} allows {limits['context']} per request"
+        )
+    return min(desired, limits["max_output"], available)
+
+
+def prompt_budget(model, completion_tokens, overhead_tokens=0):
+    """How many tokens of input text fit once the completion and prompt template are reserved."""
+    limits = model_limits(model)
+    return limits["context"] - completion_tokens - overhead_tokens - SAFETY_MARGIN
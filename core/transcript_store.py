@@ -0,0 +1,81 @@
+"""
+Transcripts live outside the note document, compressed, in
+`note_transcripts` (one doc per note, same _id). Notes stay small enough for
+history/export queries to be served from Mongo's cache; the text is only
+read when a client asks for it (/api/notes/<id>?fields=...).
+
+The cleaned transcript isn't stored: it's clean_text() of the translated
+(or raw) transcript, rebuilt on read.
+"""
+import zlib
+
+from core.utils import clean_text
+from models.mongo_models import notes, note_transcripts
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC = "zstd" if zstandard else "zlib"
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+FIELDS = ("raw_transcript", "translated_transcript", "cleaned_transcript")
+
+
+def compress(text):
+    data = text.encode("utf-8")
+    if CODEC == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(blob, codec):
+    if codec == "zstd":
+        if not zstandard:
+            raise RuntimeError("transcript is zstd-compressed but `zstandard` is not installed")
+        data = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        data = zlib.decompress(blob)
+    return data.decode("utf-8")
+
+
+def save_transcripts(note_id, raw, translated=None):
+    """Store a note's transcripts; `translated` is None when no translation happened."""
+    doc = {"codec": CODEC, "raw": compress(raw or ""), "chars": len(raw or "")}
+    if translated is not None:
+        doc["translated"] = compress(translated)
+    note_transcripts.update_one({"_id": note_id}, {"$set": doc}, upsert=True)
+
+
+def derive_cleaned(raw, translated):
+    return clean_text(translated if translated is not None else raw) or ""
+
+
+def load_transcripts(note, fields=FIELDS):
+    """
+    The requested transcript fields for `note` (needs its _id and, for notes
+    saved before this store existed, the inline transcript fields).
+    Old inline notes are moved out of line on first read.
+    """
+    if "raw_transcript" in note:
+        raw, translated = note.get("raw_transcript") or "", note.get("translated_transcript")
+        try:
+            save_transcripts(note["_id"], raw, translated)
+            notes.update_one({"_id": note["_id"]}, {"$unset": {f: "" for f in FIELDS}})
+        except Exception as e:
+            print(f"⚠️ [transcripts] Could not move {note['_id']} out of line: {e}")
+    else:
+        doc = note_transcripts.find_one({"_id": note["_id"]})
+        if not doc:
+            raw, translated = "", None
+        else:
+            raw = decompress(doc["raw"], doc.get("codec"))
+            translated = decompress(doc["translated"], doc.get("codec")) if "translated" in doc else None
+
+    values = {"raw_transcript": raw, "translated_transcript": translated}
+    if "cleaned_transcript" in fields:
+        values["cleaned_transcript"] = derive_cleaned(raw, translated)
+    return {f: values[f] for f in fields}
+
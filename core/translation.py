@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from core import metrics
+
+# Provider limit per request (googletrans / Google web endpoint)
+BATCH_CHARS = 4500
+# Host label for provider metrics (googletrans talks to Google's web endpoint)
+PROVIDER_HOST = "translate.google.com"
+SENTENCE_RE = re.compile(r"(?<=[.!?。！？؟।])\s+")
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_local = threading.local()
+_cache = OrderedDict()   # (src, target, sentence) -> translation
+
+
+def get_translator():
+    """One googletrans client per pool thread, reused across calls
+    (its HTTP client isn't safe to share between threads)."""
+    translator = getattr(_local, "translator", None)
+    if translator is None:
+        from googletrans import Translator
+        translator = _local.translator = Translator()
+    return translator
+
+
+def get_pool():
+    """Long-lived pool so the per-thread clients survive between documents."""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=Config.TRANSLATION_CONCURRENCY)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def split_sentences(text):
+    """Sentences, with any sentence over BATCH_CHARS split on whitespace."""
+    out = []
+    for sentence in SENTENCE_RE.split(text.strip()):
+        while len(sentence) > BATCH_CHARS:
+            cut = sentence.rfind(" ", 0, BATCH_CHARS)
+            cut = cut if cut > 0 else BATCH_CHARS
+            out.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            out.append(sentence)
+    return out
+
+
+def pack_batches(indexed, limit=BATCH_CHARS):
+    """Group (index, sentence) pairs into batches of whole sentences ≤ limit chars."""
+    batches, current, size = [], [], 0
+    for idx, sentence in indexed:
+        if current and size + len(sentence) + 1 > limit:
+            batches.append(current)
+            current, size = [], 0
+        current.append((idx, sentence))
+        size += len(sentence) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+
+def cache_get(key):
+    with _lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+        return value
+
+
+def cache_put(key, value):
+    with _lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > Config.TRANSLATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def translate_batch(batch, src, target):
+    """Translate one batch (one sentence per line). Returns translations aligned with the batch."""
+    joined = "\n".join(sentence for _, sentence in batch)
+    result = get_translator().translate(joined, src=src, dest=target).text
+    lines = [line.strip() for line in result.split("\n")]
+    if len(lines) == len(batch):
+        for (_, sentence), line in zip(batch, lines):
+            cache_put((src, target, sentence), line)
+        return lines
+    # provider merged/split lines: keep the batch as one block, don't cache per sentence
+    return [result.replace("\n", " ")] + [""] * (len(batch) - 1)
+
+
+def translate_document(text, src="auto", target="en"):
+    """
+    Sentence-aware, cached, concurrent translation.
+    Returns {"text", "complete", "total_batches", "failed_batches", "cached_sentences"};
+    sentences from failed batches are left untranslated and reported, not hidden.
+    """
+    sentences = split_sentences(text or "")
+    out = [cache_get((src, target, s)) for s in sentences]
+    missing = [(i, s) for i, s in enumerate(sentences) if out[i] is None]
+    batches = pack_batches(missing)
+
+    def run(batch):
+        started = time.perf_counter()
+        try:
+            return translate_batch(batch, src, target), None
+        except Exception as e:
+            metrics.inc("provider_errors_total", host=PROVIDER_HOST)
+            return None, e
+        finally:
+            metrics.observe("provider_request_seconds", time.perf_counter() - started, host=PROVIDER_HOST)
+
+    failed = 0
+    for batch, (lines, error) in zip(batches, get_pool().map(run, batches)):
+        if error is not None:
+            failed += 1
+            print(f"⚠️ [Translate] Batch of {len(batch)} sentences failed: {error}")
+            lines = [sentence for _, sentence in batch]
+        for (idx, _), line in zip(batch, lines):
+            out[idx] = line
+
+    return {
+        "text": " ".join(line for line in out if line),
+        "complete": failed == 0,
+        "total_batches": len(batches),
+        "failed_batches": failed,
+        "cached_sentences": len(sentences) - len(missing),
+    }
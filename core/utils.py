@@ -1,49 +1,50 @@
+import io
 import os
-import re
-import requests
+import hashlib
 from docx import Document
 from docx.shared import Pt
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT
 
+from core.pdf_engine import get_pdf_styles
+from core.tokens import count_tokens, truncate_tokens
+from core.notes_parser import as_tree, HEADING, BULLET, NUMBERED, BLANK
+from core.translation import translate_document
 
-# --- Font setup for PDF (Unicode safe) ---
-FONT_DIR = "storage/fonts"
-FONT_PATH = os.path.join(FONT_DIR, "NotoSans.ttf")
 
-
-def ensure_font():
-    """Download NotoSans variable font from Google Fonts repo if not available."""
-    os.makedirs(FONT_DIR, exist_ok=True)
-    if not os.path.exists(FONT_PATH):
-        print("🔽 Downloading NotoSans.ttf ...")
-        url = ("https://github.com/google/fonts/raw/main/ofl/notosans/"
-               "NotoSans%5Bwdth,wght%5D.ttf")
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        with open(FONT_PATH, "wb") as f:
-            f.write(r.content)
-        print("✅ NotoSans font downloaded!")
+# --- Content hashing (streamed, constant memory) ---
+def hash_file(path, block_size=1024 * 1024):
+    """Return the sha256 hex digest of a file, read block by block."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
 
 
 # --- Export Notes to PDF (Enhanced) ---
-def export_to_pdf(notes_text, output_path):
+def _prepare_output(output):
+    """Path / file-like to write to; an in-memory buffer when output is None."""
+    if output is None:
+        return io.BytesIO()
+    if isinstance(output, str) and os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    return output
+
+
+def export_to_pdf(notes, output_path=None):
     """
-    Enhanced PDF export – supports ## headings, - bullets,
-    numbered lists, and normal text.
+    Enhanced PDF export – renders the notes tree (## headings, - bullets,
+    numbered lists, normal text); raw notes text is parsed first.
+    Font + styles come from the per-process PDF engine.
+    Writes to `output_path` (path or file-like); returns PDF bytes when omitted.
     """
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    ensure_font()  # Ensure NotoSans font is available
-    pdfmetrics.registerFont(TTFont("NotoSans", FONT_PATH))
+    out = _prepare_output(output_path)
+    styles = get_pdf_styles()
+    heading_style, body_style, bullet_style = styles["heading"], styles["body"], styles["bullet"]
 
     doc = SimpleDocTemplate(
-        output_path,
+        out,
         pagesize=A4,
         rightMargin=50,
         leftMargin=50,
@@ -51,167 +52,119 @@ def export_to_pdf(notes_text, output_path):
         bottomMargin=50,
     )
 
-    styles = getSampleStyleSheet()
     story = []
-
-    heading_style = ParagraphStyle(
-        "Heading",
-        parent=styles["Heading2"],
-        fontName="NotoSans",
-        fontSize=14,
-        leading=18,
-        spaceAfter=10,
-        textColor=colors.HexColor("#222222"),
-    )
-
-    body_style = ParagraphStyle(
-        "Body",
-        parent=styles["Normal"],
-        fontName="NotoSans",
-        fontSize=12,
-        leading=16,
-        spaceAfter=8,
-    )
-
-    bullet_style = ParagraphStyle(
-        "Bullet",
-        parent=styles["Normal"],
-        fontName="NotoSans",
-        fontSize=12,
-        leading=16,
-        leftIndent=20,
-        bulletIndent=10,
-        spaceAfter=6,
-    )
-
-    lines = notes_text.splitlines()
-
-    for line in lines:
-        line = line.strip()
-        if not line:
+    for kind, text in as_tree(notes):
+        if kind == BLANK:
             story.append(Spacer(1, 8))
-            continue
-
-        if line.startswith("##"):
-            story.append(Paragraph(line.replace("##", "").strip(),
-                                   heading_style))
-        elif re.match(r"^[-*]\s+", line):
-            story.append(Paragraph("• " + line[2:].strip(), bullet_style))
-        elif re.match(r"^\d+\.\s+", line):
-            story.append(Paragraph(line.strip(), bullet_style))
+        elif kind == HEADING:
+            story.append(Paragraph(text, heading_style))
+        elif kind == BULLET:
+            story.append(Paragraph("• " + text, bullet_style))
+        elif kind == NUMBERED:
+            story.append(Paragraph(text, bullet_style))
         else:
-            story.append(Paragraph(line, body_style))
+            story.append(Paragraph(text, body_style))
 
     doc.build(story)
-    return output_path
+    return out.getvalue() if output_path is None else output_path
 
 
 # --- Export Notes to DOCX (Enhanced) ---
-def export_to_docx(notes_text, output_path):
+def export_to_docx(notes, output_path=None):
     """
-    Enhanced DOCX export – supports markdown-like structure (##, -, 1.)
+    Enhanced DOCX export – renders the notes tree (##, -, 1.); raw notes
+    text is parsed first.
+    Writes to `output_path` (path or file-like); returns DOCX bytes when omitted.
     """
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    out = _prepare_output(output_path)
     doc = Document()
 
-    if isinstance(notes_text, str):
-        lines = notes_text.split("\n")
-    else:
-        lines = list(notes_text)
-
-    for line in lines:
-        line = line.strip()
-        if not line:
+    for kind, text in as_tree(notes):
+        if kind == BLANK:
             doc.add_paragraph("")  # blank line for spacing
-            continue
-
-        if line.startswith("##"):
-            doc.add_heading(line.replace("##", "").strip(), level=2)
-        elif re.match(r"^[-*]\s+", line):
-            doc.add_paragraph(line[2:].strip(), style="List Bullet")
-        elif re.match(r"^\d+\.\s+", line):
-            doc.add_paragraph(line.strip(), style="List Number")
+        elif kind == HEADING:
+            doc.add_heading(text, level=2)
+        elif kind == BULLET:
+            doc.add_paragraph(text, style="List Bullet")
+        elif kind == NUMBERED:
+            doc.add_paragraph(text, style="List Number")
         else:
-            doc.add_paragraph(line)
+            doc.add_paragraph(text)
 
-    doc.save(output_path)
-    return output_path
+    doc.save(out)
+    return out.getvalue() if output_path is None else output_path
 
 
-# --- Extract Audio from Video ---
-def extract_audio_from_video(video_path, output_path, duration=120):
+# --- Transcript cleanup ---
+def clean_text(text):
+    """Remove filler words and extra whitespace."""
+    if not text:
+        return text
+    for w in [" um ", " uh ", " you know ", " like "]:
+        text = text.replace(w, " ")
+    return " ".join(text.split())
+
+
+# --- Translation helper (see core/translation.py) ---
+def translate_text(text, src="auto", target="en"):
     """
-    Extract first `duration` seconds of audio from a video (e.g. MP4).
-    Save as .mp3 file.
+    Translate `text` to target language. Untranslatable batches keep their
+    original text; use translation.translate_document for the failure report.
     """
-    from moviepy.editor import VideoFileClip
-
-    if not os.path.exists(video_path):
-        raise FileNotFoundError(f"Video not found: {video_path}")
-
-    clip = VideoFileClip(video_path)
-    audio_clip = None
-    try:
-        if clip.audio is None:
-            raise RuntimeError("No audio track found in video!")
-
-        audio_clip = clip.audio.subclip(0, duration)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        audio_clip.write_audiofile(output_path, codec="mp3")
-    finally:
-        if audio_clip:
-            try:
-                audio_clip.close()
-            except Exception:
-                pass
-        if clip:
-            try:
-                clip.close()
-            except Exception:
-                pass
-
-    return output_path
-
-
-# --- Translation helper (uses googletrans, fallback to identity) ---
-def translate_text(text, src="auto", target="en"):
+    return translate_document(text, src=src, target=target)["text"]
+
+
+# --- Overlapping chunker for long transcripts ---
+def split_into_chunks(text, chunk_chars=10000, overlap_chars=800):
     """
-    Translate `text` to target language. Uses googletrans if installed.
-    Returns translated text or original text on failure.
+    Split text into chunks of at most `chunk_chars`, cutting at sentence
+    boundaries where possible. Consecutive chunks share ~`overlap_chars`
+    so nothing said across a cut is lost.
     """
-    try:
-        from googletrans import Translator
-
-        translator = Translator()
-        if len(text) <= 4500:
-            return translator.translate(text, src=src, dest=target).text
-        out = []
-        start = 0
-        while start < len(text):
-            chunk = text[start:start + 4500]
-            out.append(translator.translate(chunk, src=src, dest=target).text)
-            start += 4500
-        return "\n".join(out)
-    except Exception:
-        return text
+    if not text or len(text) <= chunk_chars:
+        return [text] if text else []
+    return list(iter_chunks([text], chunk_chars, overlap_chars))
 
 
-# --- Token/text optimizer (heuristic) ---
+def iter_chunks(pieces, chunk_chars=10000, overlap_chars=800):
+    """
+    Incremental split_into_chunks over " ".join(pieces): a chunk is yielded
+    as soon as enough text has arrived to know where it ends, and chunks
+    come out exactly as split_into_chunks would cut the joined text.
+    """
+    text = None
+    start = 0
+    for piece in pieces:
+        text = piece if text is None else text + " " + piece
+        while len(text) - start > chunk_chars:
+            end = start + chunk_chars
+            cut = max(text.rfind(". ", start, end), text.rfind("? ", start, end), text.rfind("! ", start, end))
+            if cut > start + chunk_chars // 2:
+                end = cut + 1
+            yield text[start:end].strip()
+            # step back into the previous chunk, starting on a sentence if we can
+            back = max(start + 1, end - overlap_chars)
+            sentence = text.find(". ", back, end)
+            start = sentence + 2 if sentence != -1 else back
+            # drop text no later chunk can reach
+            text, start = text[start:], 0
+    if text and start < len(text):
+        yield text[start:].strip()
+
+
+# --- Token/text optimizer ---
 def optimize_for_tokens(text, max_tokens=3000):
     """
-    Heuristic to reduce text length to approximately max_tokens.
-    Approx tokens = chars/4 (simple estimate).
-    Tries to cut at sentence boundary.
+    Reduce text to at most max_tokens, counted with the LLM tokenizer
+    (core.tokens). Tries to cut at sentence boundary.
     """
     if not text:
         return text
-    approx_tokens = len(text) / 4.0
-    if approx_tokens <= max_tokens:
+    if count_tokens(text) <= max_tokens:
         return text
 
-    ratio = max_tokens / approx_tokens
-    max_chars = max(200, int(len(text) * ratio))
-    cut = text[:max_chars]
+    cut = truncate_tokens(text, max_tokens)
+    max_chars = len(cut)
     last_dot = max(cut.rfind("."), cut.rfind("!\n"), cut.rfind("?\n"))
     if last_dot and last_dot > int(0.5 * max_chars):
         return cut[: last_dot + 1]
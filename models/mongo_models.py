@@ -1,4 +1,4 @@
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, TEXT
 from config import Config
 from datetime import datetime
 
@@ -7,8 +7,26 @@ db = client["talktotext"]
 users = db.users
 notes = db.notes
 uploads = db.uploads
+transcripts = db.transcripts
+# compressed note transcripts, keyed by note _id (core/transcript_store.py)
+note_transcripts = db.note_transcripts
+# one doc per note for /api/search (core/search.py)
+search_index = db.search_index
 
 # Indexes
 users.create_index([("email", ASCENDING)], unique=True)
-notes.create_index([("user_id", ASCENDING), ("created_at", ASCENDING)])
-uploads.create_index([("status", ASCENDING)]) 
+# history: equality on user_id, newest first, _id breaks created_at ties (keyset pagination)
+notes.create_index([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)])
+uploads.create_index([("status", ASCENDING)])
+uploads.create_index([("transcription.segments.id", ASCENDING)], sparse=True)
+transcripts.create_index(
+    [("audio_sha256", ASCENDING), ("language", ASCENDING), ("extract_duration", ASCENDING)],
+    unique=True
+)
+# user_id prefix: every text query is scoped to one user's notes
+search_index.create_index(
+    [("user_id", ASCENDING), ("notes", TEXT), ("transcript", TEXT)],
+    weights={"notes": 3, "transcript": 1},
+    default_language="english",
+    name="user_text"
+)
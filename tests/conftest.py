@@ -0,0 +1,18 @@
+"""
+Unit tests run without Mongo, Redis or provider keys: the in-memory Mongo
+from benchmarks/ stands in for models.mongo_models before anything imports it.
+(test_api_endpoints.py talks to a running server and needs neither.)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("REDIS_URL", "")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("UPLOAD_FOLDER", os.path.join(ROOT, "storage", "test_uploads"))
+
+from benchmarks import fake_mongo  # noqa: E402
+
+fake_mongo.install()
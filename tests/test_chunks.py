@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from core.utils import split_into_chunks, iter_chunks
+
+
+def reference_chunks(text, chunk_chars, overlap_chars):
+    """split_into_chunks as it was before iter_chunks: one pass over the whole text."""
+    if not text or len(text) <= chunk_chars:
+        return [text] if text else []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            cut = max(text.rfind(". ", start, end), text.rfind("? ", start, end), text.rfind("! ", start, end))
+            if cut > start + chunk_chars // 2:
+                end = cut + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        back = max(start + 1, end - overlap_chars)
+        sentence = text.find(". ", back, end)
+        start = sentence + 2 if sentence != -1 else back
+    return chunks
+
+
+def random_pieces(rng):
+    words = ["we", "agreed", "ship", "friday", "budget", "ok", "why", "next"]
+    pieces = []
+    for _ in range(rng.randint(1, 40)):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 25)))
+        pieces.append(sentence + rng.choice([".", "?", "!", ",", ""]))
+    return pieces
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_iter_chunks_matches_split_into_chunks(seed):
+    rng = random.Random(seed)
+    pieces = random_pieces(rng)
+    chunk_chars = rng.randint(20, 400)
+    overlap_chars = rng.randint(0, chunk_chars // 2)
+    text = " ".join(pieces)
+
+    expected = reference_chunks(text, chunk_chars, overlap_chars)
+    assert split_into_chunks(text, chunk_chars, overlap_chars) == expected
+    assert list(iter_chunks(pieces, chunk_chars, overlap_chars)) == expected
+
+
+def test_empty_input():
+    assert split_into_chunks("", 100, 10) == []
+    assert list(iter_chunks([], 100, 10)) == []
@@ -0,0 +1,140 @@
+import pytest
+
+from core.media import (
+    plan_segments, to_source_time, to_processed_time, map_silences, keep_segments, parse_silencedetect,
+)
+from core.ai_pipeline import stitch_segments
+
+
+# ------------------ plan_segments ------------------
+def test_short_recording_is_one_segment():
+    assert plan_segments([], 100.0, 600) == [(0.0, 100.0)]
+
+
+def test_cuts_in_latest_silence_of_second_half():
+    silences = [(400.0, 402.0), (550.0, 552.0)]
+    assert plan_segments(silences, 1000.0, 600) == [(0.0, 551.0), (551.0, 1000.0)]
+
+
+def test_silence_in_first_half_is_ignored():
+    assert plan_segments([(100.0, 102.0)], 700.0, 600) == [(0.0, 600.0), (600.0, 700.0)]
+
+
+def test_hard_cuts_without_silence():
+    assert plan_segments([], 1300.0, 600) == [(0.0, 600.0), (600.0, 1200.0), (1200.0, 1300.0)]
+
+
+def test_segments_are_contiguous_and_bounded():
+    silences = [(float(s), s + 0.8) for s in range(37, 5000, 173)]
+    segments = plan_segments(silences, 5000.0, 600)
+    assert segments[0][0] == 0.0 and segments[-1][1] == 5000.0
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+    assert all(0 < end - start <= 600 for start, end in segments)
+
+
+# ------------------ keep_segments ------------------
+def test_keeps_the_tail_after_the_last_pause():
+    silences = [(0.0, 2.0), (100.0, 110.0), (200.0, 230.0)]
+    assert keep_segments(silences, 3600.0, 1.0) == [
+        (2.0, 100.5), (109.5, 200.5), (229.5, 3600.0)
+    ]
+
+
+def test_drops_trailing_silence():
+    assert keep_segments([(50.0, 60.0)], 60.0, 1.0) == [(0.0, 50.0)]
+
+
+def test_unknown_duration_is_refused():
+    # without it the final span would silently be dropped
+    with pytest.raises(ValueError):
+        keep_segments([(100.0, 110.0)], None, 1.0)
+
+
+# ------------------ parse_silencedetect ------------------
+def test_duration_from_header():
+    log = ("  Duration: 01:00:00.50, start: 0.000000, bitrate: 128 kb/s\n"
+           "[silencedetect @ 0x1] silence_start: 10.5\n"
+           "[silencedetect @ 0x1] silence_end: 12 | silence_duration: 1.5\n")
+    assert parse_silencedetect(log) == ([(10.5, 12.0)], 3600.5)
+
+
+def test_duration_from_progress_when_header_says_na():
+    log = ("  Duration: N/A, start: 0.000000, bitrate: N/A\n"
+           "size=N/A time=00:30:00.00 bitrate=N/A speed=900x\r"
+           "[silencedetect @ 0x1] silence_start: 3590\n"
+           "size=N/A time=01:00:00.02 bitrate=N/A speed=901x\n")
+    assert parse_silencedetect(log) == ([(3590.0, 3600.02)], 3600.02)
+
+
+# ------------------ to_source_time ------------------
+# (out_start, src_start, length): 0-10s came from 2-12s, 10-15s from 15-20s
+TIME_MAP = [(0.0, 2.0, 10.0), (10.0, 15.0, 5.0)]
+
+
+def test_without_time_map_times_are_unchanged():
+    assert to_source_time(42.5, None) == 42.5
+    assert to_source_time(42.5, []) == 42.5
+
+
+def test_maps_into_kept_spans():
+    assert to_source_time(0.0, TIME_MAP) == 2.0
+    assert to_source_time(5.0, TIME_MAP) == 7.0
+    assert to_source_time(10.0, TIME_MAP) == 15.0
+    assert to_source_time(12.5, TIME_MAP) == 17.5
+
+
+def test_clamps_past_the_end_of_a_span():
+    assert to_source_time(30.0, TIME_MAP) == 20.0
+
+
+# ------------------ map_silences ------------------
+def test_processed_time_inverts_source_time():
+    for t in (0.0, 5.0, 10.0, 12.5):
+        assert to_processed_time(to_source_time(t, TIME_MAP), TIME_MAP) == t
+
+
+def test_cut_stretches_collapse_to_their_edge():
+    assert to_processed_time(1.0, TIME_MAP) == 0.0
+    assert to_processed_time(13.0, TIME_MAP) == 10.0
+
+
+def test_silences_map_into_processed_time():
+    # the leading silence was trimmed away entirely; 11-16s straddles the cut
+    assert map_silences([(0.0, 2.0), (11.0, 16.0), (17.0, 18.0)], TIME_MAP) == [
+        (9.0, 11.0), (12.0, 13.0)
+    ]
+
+
+# ------------------ stitch_segments ------------------
+def make_segments():
+    return [
+        {"index": 1, "offset": 600.0, "text": "again", "language_code": "en",
+         "words": [[100, 400, "again"]]},
+        {"index": 2, "offset": 1200.0, "text": "", "language_code": "es", "words": []},
+        {"index": 0, "offset": 0.0, "text": " hello world ", "language_code": "en",
+         "words": [[0, 500, "hello"], [600, 1000, "world"]]},
+    ]
+
+
+def test_stitches_in_index_order_with_offsets():
+    text, lang, words = stitch_segments(make_segments())
+    assert text == "hello world again"
+    # silent segments don't vote on the language
+    assert lang == "en"
+    assert words == [[0, 500, "hello"], [600, 1000, "world"], [600100, 600400, "again"]]
+
+
+def test_word_times_map_back_through_time_map():
+    _, _, words = stitch_segments(make_segments(), [(0.0, 5.0, 1000.0)])
+    assert words == [[5000, 5500, "hello"], [5600, 6000, "world"], [605100, 605400, "again"]]
+
+
+def test_word_times_are_rounded_not_truncated():
+    segments = [{"index": 0, "offset": 1.0, "text": "hi", "language_code": "en", "words": [[5, 9, "hi"]]}]
+    _, _, words = stitch_segments(segments)
+    assert words == [[1005, 1009, "hi"]]
+
+
+def test_no_text_means_auto_language():
+    assert stitch_segments([{"index": 0, "offset": 0.0, "text": ""}]) == ("", "auto", [])